@@ -1,11 +1,22 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 import datetime as dt
+from functools import lru_cache
+import time
+from typing import Annotated, Any
 import uuid
 
 import bcrypt
+from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 
-from app.exceptions.exceptions import ExcExpiredToken, ExcInvalidToken
+from app.cache.utils import LRUCache
+from app.configs.datamodels import Settings
+from app.configs.utils import get_settings
+from app.exceptions.exceptions import ExcAuthBusy, ExcExpiredToken, ExcInvalidToken
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/token")
 
@@ -17,13 +28,80 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: int = 12) -> str:
     return bcrypt.hashpw(
         bytes(password, encoding="utf-8"),
-        bcrypt.gensalt(),
+        bcrypt.gensalt(rounds=rounds),
     ).decode("utf-8")
 
 
+@dataclass
+class PasswordHasherStats:
+    completed: int = 0
+    rejected: int = 0
+    pending: int = 0
+    queue_time_seconds_total: float = 0.0
+    queue_time_seconds_max: float = 0.0
+    run_time_seconds_total: float = 0.0
+
+
+class PasswordHasher:
+    # bcrypt releases the GIL while hashing, so a thread pool spreads the work
+    # across cores without the pickling overhead of a process pool.
+
+    def __init__(self, max_workers: int, max_pending: int, rounds: int) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.stats = PasswordHasherStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.stats.pending >= self.max_pending:
+            self.stats.rejected += 1
+            raise ExcAuthBusy(pending=self.stats.pending)
+
+        submitted_at = time.perf_counter()
+
+        def timed() -> tuple[float, float, Any]:
+            started_at = time.perf_counter()
+            result = func(*args)
+            return started_at - submitted_at, time.perf_counter() - started_at, result
+
+        self.stats.pending += 1
+        try:
+            queue_time, run_time, result = await asyncio.wrap_future(self._executor.submit(timed))
+        finally:
+            self.stats.pending -= 1
+        self.stats.completed += 1
+        self.stats.queue_time_seconds_total += queue_time
+        self.stats.queue_time_seconds_max = max(self.stats.queue_time_seconds_max, queue_time)
+        self.stats.run_time_seconds_total += run_time
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password, self.rounds)
+
+    def get_stats(self) -> dict[str, int | float]:
+        return dict(asdict(self.stats), max_workers=self.max_workers, max_pending=self.max_pending)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache()
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        max_workers=max(settings.auth_hash_workers // settings.web_concurrency, 1),
+        max_pending=max(settings.auth_hash_max_pending // settings.web_concurrency, 1),
+        rounds=settings.auth_bcrypt_rounds,
+    )
+
+
 def get_access_token(data: dict, secret_key: str, algorithm: str, expire_minutes: int) -> str:
     token = jwt.encode(
         payload=dict(
@@ -38,9 +116,9 @@ def get_access_token(data: dict, secret_key: str, algorithm: str, expire_minutes
     return token
 
 
-def validate_access_token(token: str, secret_key: str, algorithms: list[str]) -> uuid.UUID:
+def decode_access_token(token: str, secret_key: str, algorithms: list[str]) -> dict:
     try:
-        payload: dict = jwt.decode(
+        return jwt.decode(
             jwt=token, key=secret_key, algorithms=algorithms, options={"verify_exp": True}
         )
     except jwt.ExpiredSignatureError as e:
@@ -48,4 +126,68 @@ def validate_access_token(token: str, secret_key: str, algorithms: list[str]) ->
     except jwt.InvalidTokenError as e:
         raise ExcInvalidToken from e
 
+
+def validate_access_token(token: str, secret_key: str, algorithms: list[str]) -> uuid.UUID:
+    payload = decode_access_token(token=token, secret_key=secret_key, algorithms=algorithms)
     return payload.get("user_id")
+
+
+class VerifiedTokenCache(LRUCache):
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.verifications = 0
+        self.verification_seconds_total = 0.0
+        self.time_saved_seconds_total = 0.0
+
+    def get_user_id(self, token: str, secret_key: str, algorithms: list[str]) -> uuid.UUID:
+        user_id = self.get(token)
+        if user_id is not None:
+            self.time_saved_seconds_total += self.verification_seconds_total / self.verifications
+            return user_id
+
+        started_at = time.perf_counter()
+        payload = decode_access_token(token=token, secret_key=secret_key, algorithms=algorithms)
+        try:
+            user_id = uuid.UUID(payload["user_id"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ExcInvalidToken from e
+        self.verifications += 1
+        self.verification_seconds_total += time.perf_counter() - started_at
+
+        # Entries never outlive the token: map its wall-clock exp onto the monotonic clock.
+        expires_at = None
+        if isinstance(payload.get("exp"), int | float):
+            expires_at = time.monotonic() + payload["exp"] - time.time()
+        self.set(token, user_id, expires_at=expires_at)
+        return user_id
+
+    def get_stats(self) -> dict[str, int | float]:
+        lookups = self.stats.hits + self.stats.misses
+        return dict(
+            super().get_stats(),
+            hit_rate=self.stats.hits / lookups if lookups else 0.0,
+            verifications=self.verifications,
+            verification_seconds_total=self.verification_seconds_total,
+            time_saved_seconds_total=self.time_saved_seconds_total,
+        )
+
+
+@lru_cache()
+def get_token_cache() -> VerifiedTokenCache:
+    settings = get_settings()
+    return VerifiedTokenCache(
+        max_size=settings.auth_token_cache_max_size,
+        ttl_seconds=settings.auth_token_cache_ttl_seconds,
+    )
+
+
+async def current_user(
+    settings: Annotated[Settings, Depends(get_settings)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> uuid.UUID:
+    # Async so it runs on the event loop, the token cache is not thread-safe.
+    return get_token_cache().get_user_id(
+        token=token,
+        secret_key=settings.auth_secret_key,
+        algorithms=[settings.auth_algorithm],
+    )
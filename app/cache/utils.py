@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import asdict, dataclass
+import time
+from typing import Any
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class LRUCache:
+    # Not thread-safe: instances are only touched from the event loop.
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # Invalidation count at each key's latest invalidation, up to max_size keys. Counts
+        # below `_invalidated_before` may have been forgotten and are treated as every key's.
+        self._invalidated: OrderedDict[Hashable, int] = OrderedDict()
+        self._invalidated_before = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        expires_at: float | None = None,
+        invalidations: int | None = None,
+    ) -> None:
+        # Callers that loaded `value` before a concurrent invalidation pass the
+        # invalidation count seen before loading, so stale values are dropped. Only
+        # invalidations of this key count, others do not discard fills in flight.
+        if invalidations is not None and self.is_invalidated_since(key, invalidations):
+            return
+        ttl_expires_at = time.monotonic() + self.ttl_seconds
+        expires_at = ttl_expires_at if expires_at is None else min(expires_at, ttl_expires_at)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def is_invalidated_since(self, key: Hashable, invalidations: int) -> bool:
+        return max(self._invalidated.get(key, 0), self._invalidated_before) > invalidations
+
+    def invalidate(self, *keys: Hashable) -> None:
+        self.stats.invalidations += 1
+        for key in keys:
+            self._entries.pop(key, None)
+            self._invalidated[key] = self.stats.invalidations
+            self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self.max_size:
+            _, self._invalidated_before = self._invalidated.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated.clear()
+        self.stats.invalidations += 1
+        self._invalidated_before = self.stats.invalidations
+
+    def get_stats(self) -> dict[str, int]:
+        return dict(asdict(self.stats), size=len(self._entries), max_size=self.max_size)
@@ -1,4 +1,5 @@
 from enum import StrEnum
+import os
 from typing import Annotated
 
 from pydantic import Field
@@ -24,13 +25,44 @@ class Settings(BaseSettings):
     environment: Annotated[Environment, Field(Environment.DEVELOPMENT)]
     logger_name: Annotated[str, Field("generic_ecommerce_api")]
     logger_level: Annotated[str, Field("INFO")]
+    logger_access_log_sample_rate: Annotated[float, Field(1.0, ge=0.0, le=1.0)]
+    # Worker processes per host, also read by uvicorn as its --workers default.
+    web_concurrency: Annotated[int, Field(1, gt=0)]
 
     db_host: Annotated[str, Field("localhost")]
     db_port: Annotated[int, Field(5432)]
     db_user: Annotated[str, Field(...)]
     db_password: Annotated[str, Field(...)]
     db_name: Annotated[str, Field("generic_ecommerce_api")]
+    db_pool_size: Annotated[int, Field(20, gt=0)]
+    db_max_overflow: Annotated[int, Field(30, ge=0)]
+    db_repeated_query_threshold: Annotated[int, Field(10, gt=1)]
 
     auth_secret_key: Annotated[str, Field(...)]
     auth_algorithm: Annotated[str, Field("HS256")]
     auth_access_token_expire_minutes: Annotated[int, Field(60 * 24)]
+    auth_bcrypt_rounds: Annotated[int, Field(12, ge=4, le=31)]
+    auth_hash_workers: Annotated[int, Field(default_factory=lambda: os.cpu_count() or 1, gt=0)]
+    auth_hash_max_pending: Annotated[int, Field(64, gt=0)]
+    auth_token_cache_max_size: Annotated[int, Field(10_000, gt=0)]
+    auth_token_cache_ttl_seconds: Annotated[float, Field(300.0, gt=0)]
+
+    items_query_max_limit: Annotated[int, Field(100, gt=0)]
+    export_batch_size: Annotated[int, Field(1000, gt=0)]
+    delivery_options_refresh_seconds: Annotated[float, Field(300.0, gt=0)]
+    discounts_refresh_seconds: Annotated[float, Field(60.0, gt=0)]
+
+    idempotency_key_ttl_seconds: Annotated[int, Field(24 * 60 * 60, gt=0)]
+    idempotency_key_cleanup_seconds: Annotated[float, Field(60 * 60, gt=0)]
+
+    finalizer_interval_seconds: Annotated[float, Field(60.0, gt=0)]
+    finalizer_batch_size: Annotated[int, Field(500, gt=0)]
+    finalizer_target_per_second: Annotated[float, Field(1000.0, gt=0)]
+
+    health_probe_interval_seconds: Annotated[float, Field(5.0, gt=0)]
+    health_db_timeout_seconds: Annotated[float, Field(2.0, gt=0)]
+    health_max_pool_saturation: Annotated[float, Field(0.9, gt=0.0, le=1.0)]
+    health_max_loop_lag_seconds: Annotated[float, Field(0.5, gt=0)]
+
+    item_cache_max_size: Annotated[int, Field(10_000, gt=0)]
+    item_cache_ttl_seconds: Annotated[float, Field(30.0, gt=0)]
@@ -2,7 +2,7 @@ import datetime as dt
 from decimal import Decimal
 import uuid
 
-from sqlalchemy import Column, DateTime, Integer, Numeric, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, Numeric, String, Text, text
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlmodel import CheckConstraint, Field, ForeignKey, SQLModel
 
@@ -12,6 +12,9 @@ class DBItem(SQLModel, table=True):
     __table_args__ = (
         CheckConstraint("stock >= 0", name="check_stock_non_negative"),
         CheckConstraint("price > 0", name="check_price_positive"),
+        Index("items_category_item_id_idx", "category", "item_id"),
+        Index("items_brand_item_id_idx", "brand", "item_id"),
+        Index("items_subcategories_idx", "subcategories", postgresql_using="gin"),
     )
 
     item_id: uuid.UUID = Field(
@@ -111,6 +114,7 @@ class DBDiscount(SQLModel, table=True):
 
 class DBTransaction(SQLModel, table=True):
     __tablename__ = "transactions"
+    __table_args__ = (Index("transactions_user_id_created_at_idx", "user_id", "created_at"),)
 
     transaction_id: uuid.UUID = Field(
         sa_column=Column(
@@ -150,6 +154,7 @@ class DBTransaction(SQLModel, table=True):
 
 class DBTransactionDiscount(SQLModel, table=True):
     __tablename__ = "transaction_discounts"
+    __table_args__ = (Index("transaction_discounts_transaction_id_idx", "transaction_id"),)
 
     row_id: int = Field(sa_column=Column(Integer, primary_key=True, autoincrement=True))
     transaction_id: uuid.UUID = Field(
@@ -169,6 +174,7 @@ class DBTransactionItem(SQLModel, table=True):
     __table_args__ = (
         CheckConstraint("count > 0", name="check_count_positive"),
         CheckConstraint("price_after_discounts >= 0", name="check_price_non_negative"),
+        Index("transaction_items_transaction_id_idx", "transaction_id"),
     )
 
     row_id: int = Field(sa_column=Column(Integer, primary_key=True, autoincrement=True))
@@ -189,6 +195,16 @@ class DBTransactionItem(SQLModel, table=True):
 
 class DBTransactionAction(SQLModel, table=True):
     __tablename__ = "transaction_actions"
+    __table_args__ = (
+        Index(
+            "transaction_actions_transaction_id_performed_at_idx", "transaction_id", "performed_at"
+        ),
+        Index(
+            "transaction_actions_finalized_performed_at_idx",
+            "performed_at",
+            postgresql_where=text("action = 'REQUEST FINALIZED'"),
+        ),
+    )
 
     action_id: uuid.UUID = Field(
         sa_column=Column(
@@ -212,6 +228,7 @@ class DBTransactionAction(SQLModel, table=True):
 
 class DBTransactionFinalized(SQLModel, table=True):
     __tablename__ = "transactions_finalized"
+    __table_args__ = (Index("transactions_finalized_user_id_idx", "user_id"),)
 
     transaction_id: uuid.UUID = Field(sa_column=Column(UUID(as_uuid=True), primary_key=True))
     user_id: uuid.UUID = Field(sa_column=Column(UUID(as_uuid=True), nullable=False))
@@ -232,3 +249,21 @@ class DBTransactionFinalized(SQLModel, table=True):
     delivery: dict = Field(sa_column=Column(JSONB, nullable=False))
     items: list[dict] = Field(sa_column=Column(JSONB, nullable=False))
     action_history: list[dict] = Field(sa_column=Column(JSONB, nullable=False))
+
+
+class DBIdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("idempotency_keys_expires_at_idx", "expires_at"),)
+
+    user_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("users.user_id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    idempotency_key: str = Field(sa_column=Column(String(256), primary_key=True))
+    request_hash: str = Field(sa_column=Column(String(64), nullable=False))
+    response: dict | None = Field(sa_column=Column(JSONB, nullable=True), default=None)
+    created_at: dt.datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    expires_at: dt.datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
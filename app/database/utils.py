@@ -1,35 +1,151 @@
-from typing import Generator
+from collections.abc import AsyncGenerator, Iterable, Iterator
+import contextlib
+from contextvars import ContextVar
+from functools import lru_cache
+import os
+import time
+from typing import Any
 
-from sqlalchemy import create_engine
-from sqlalchemy.pool import QueuePool
-from sqlmodel import Session
+from sqlalchemy import Column, event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.configs.datamodels import Environment
+from app.configs.datamodels import Environment, Settings
 from app.configs.utils import get_settings
+from app.metrics.utils import get_metrics
 
 settings = get_settings()
 
 DATABASE_URL = (
-    f"postgresql://{settings.db_user}:{settings.db_password}"
+    f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}"
     f"@{settings.db_host}:{settings.db_port}/{settings.db_name}"
 )
 
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=20,
-    max_overflow=30,
-    pool_pre_ping=True,
-    echo=settings.environment is Environment.DEVELOPMENT,
-    pool_recycle=3600,
-)
+class QueryStats:
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.statements: dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.duration += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def get_repeated(self, threshold: int) -> dict[str, int]:
+        return {
+            statement: count for statement, count in self.statements.items() if count >= threshold
+        }
 
 
-def get_db_session() -> Generator[Session, None, None]:
-    db = Session(engine)
+QUERY_STATS: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextlib.contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    query_stats = QueryStats()
+    token = QUERY_STATS.set(query_stats)
     try:
-        yield db
+        yield query_stats
     finally:
-        db.close()
+        QUERY_STATS.reset(token)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    if QUERY_STATS.get() is not None:
+        context.query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    query_stats = QUERY_STATS.get()
+    started_at = getattr(context, "query_started_at", None)
+    if query_stats is not None and started_at is not None:
+        query_stats.record(statement, time.perf_counter() - started_at)
+
+
+def track_engine_queries(engine: AsyncEngine) -> None:
+    # The async engine runs these sync events in the caller's context, so statements
+    # are counted against the QueryStats of the request or test that issued them.
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def connect(self) -> PoolProxiedConnection:
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            get_metrics().db_pool_checkout.observe(time.perf_counter() - started_at)
+
+
+def get_pool_limits(settings: Settings) -> tuple[int, int]:
+    # The configured pool is the budget of the whole host, split across its workers.
+    return (
+        max(settings.db_pool_size // settings.web_concurrency, 1),
+        settings.db_max_overflow // settings.web_concurrency,
+    )
+
+
+@lru_cache()
+def get_engine() -> AsyncEngine:
+    # Created on first use in each worker process, never inherited from a parent.
+    pool_size, max_overflow = get_pool_limits(settings)
+    engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        echo=settings.environment is Environment.DEVELOPMENT,
+        pool_recycle=3600,
+    )
+    track_engine_queries(engine)
+    return engine
+
+
+def _reset_engine_after_fork() -> None:
+    # uvicorn --workers spawns fresh interpreters, this only runs under servers that fork
+    # after importing the app, like gunicorn --preload. The child must not reuse the
+    # parent's connections, nor close them.
+    if get_engine.cache_info().currsize:
+        get_engine().sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engine_after_fork)
+
+
+def async_session_factory() -> AsyncSession:
+    return AsyncSession(get_engine(), expire_on_commit=False)
+
+
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_factory() as db:
+        yield db
+
+
+def get_columns(db_model: type[SQLModel], names: Iterable[str]) -> tuple[Column, ...]:
+    # Core columns of the model's table. Selects built only from them return plain rows,
+    # without ORM instances, identity map bookkeeping or attribute instrumentation.
+    return tuple(db_model.__table__.c[name] for name in names)
@@ -0,0 +1,72 @@
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+import math
+import time
+from types import MappingProxyType
+import uuid
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.configs.utils import get_settings
+from app.database.dbmodels import DBDeliveryOptions
+from app.database.utils import async_session_factory
+
+
+@dataclass(frozen=True, slots=True)
+class DeliveryOption:
+    option_id: uuid.UUID
+    name: str
+    contractor_id: uuid.UUID
+    price: Decimal
+
+
+class DeliveryOptionsSnapshot:
+    def __init__(self, min_refresh_seconds: float) -> None:
+        self.min_refresh_seconds = min_refresh_seconds
+        self.options: Mapping[uuid.UUID, DeliveryOption] = MappingProxyType({})
+        self._refreshed_at = -math.inf
+
+    async def refresh(self, db: AsyncSession) -> None:
+        # Stamped before the query, so misses arriving while it runs do not start another.
+        self._refreshed_at = time.monotonic()
+        options = {
+            delivery_option_db.option_id: DeliveryOption(
+                option_id=delivery_option_db.option_id,
+                name=delivery_option_db.name,
+                contractor_id=delivery_option_db.contractor_id,
+                price=delivery_option_db.price,
+            )
+            for delivery_option_db in await db.exec(select(DBDeliveryOptions))
+        }
+        # A single reference assignment, readers see either the old or the new snapshot.
+        self.options = MappingProxyType(options)
+
+    async def get_many(
+        self, db: AsyncSession, option_ids: Iterable[uuid.UUID]
+    ) -> dict[uuid.UUID, DeliveryOption]:
+        options = self.options
+        option_ids = set(option_ids)
+        # Options added since the last scheduled refresh. Unknown or deleted ids could
+        # otherwise reload the whole table on every request, so misses reload it at most
+        # once per `min_refresh_seconds` and the scheduled refresh picks up the rest.
+        if (
+            not option_ids <= options.keys()
+            and time.monotonic() - self._refreshed_at >= self.min_refresh_seconds
+        ):
+            await self.refresh(db)
+            options = self.options
+        return {option_id: options[option_id] for option_id in option_ids if option_id in options}
+
+
+@lru_cache()
+def get_delivery_options_snapshot() -> DeliveryOptionsSnapshot:
+    # New options show up within 10 s at the default 300 s refresh interval.
+    return DeliveryOptionsSnapshot(get_settings().delivery_options_refresh_seconds / 30)
+
+
+async def refresh_delivery_options_snapshot() -> None:
+    async with async_session_factory() as db:
+        await get_delivery_options_snapshot().refresh(db)
@@ -0,0 +1,112 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+import datetime as dt
+from decimal import Decimal
+from functools import lru_cache
+import time
+from types import MappingProxyType
+import uuid
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.configs.utils import get_settings
+from app.database.dbmodels import DBDiscount, DBItem
+
+
+@dataclass(frozen=True, slots=True)
+class DiscountMatcher:
+    discount_code: str
+    discount_percentage: Decimal
+    multiplier: Decimal
+    valid_from: dt.datetime
+    valid_to: dt.datetime
+    # None means the discount is not restricted on that attribute.
+    item_ids: frozenset[uuid.UUID] | None
+    brands: frozenset[str] | None
+    categories: Mapping[str, frozenset[str]] | None
+
+    @classmethod
+    def from_db(cls, discount_db: DBDiscount) -> "DiscountMatcher":
+        return cls(
+            discount_code=discount_db.discount_code,
+            discount_percentage=discount_db.discount_percentage,
+            multiplier=1 - (discount_db.discount_percentage / 100),
+            valid_from=discount_db.valid_from,
+            valid_to=discount_db.valid_to,
+            item_ids=frozenset(discount_db.item_ids) if discount_db.item_ids else None,
+            brands=frozenset(discount_db.brands) if discount_db.brands else None,
+            categories=MappingProxyType(
+                {
+                    category: frozenset(subcategories or ())
+                    for category, subcategories in discount_db.categories.items()
+                }
+            )
+            if discount_db.categories
+            else None,
+        )
+
+    def is_valid(self, now: dt.datetime) -> bool:
+        return self.valid_from <= now < self.valid_to
+
+    def matches(self, item_db: DBItem) -> bool:
+        if self.item_ids is not None and item_db.item_id not in self.item_ids:
+            return False
+        if self.brands is not None and item_db.brand not in self.brands:
+            return False
+        if self.categories is not None:
+            subcategories = self.categories.get(item_db.category)
+            if (
+                subcategories is None
+                or not item_db.subcategories
+                or subcategories.isdisjoint(item_db.subcategories)
+            ):
+                return False
+        return True
+
+
+class DiscountRegistry:
+    def __init__(self, refresh_seconds: float) -> None:
+        self.refresh_seconds = refresh_seconds
+        self._matchers: tuple[DiscountMatcher, ...] = ()
+        self._active: Mapping[str, DiscountMatcher] = MappingProxyType({})
+        self._next_boundary: dt.datetime | None = None
+        self._reload_at = 0.0
+
+    async def get_active(self, db: AsyncSession) -> Mapping[str, DiscountMatcher]:
+        if time.monotonic() >= self._reload_at:
+            await self.reload(db)
+        else:
+            now = dt.datetime.now(dt.UTC)
+            if self._next_boundary is not None and now >= self._next_boundary:
+                self._activate(now)
+        return self._active
+
+    async def reload(self, db: AsyncSession) -> None:
+        now = dt.datetime.now(dt.UTC)
+        query = select(DBDiscount).where(DBDiscount.valid_to > now)
+        self._matchers = tuple(
+            DiscountMatcher.from_db(discount) for discount in await db.exec(query)
+        )
+        self._reload_at = time.monotonic() + self.refresh_seconds
+        self._activate(now)
+
+    def _activate(self, now: dt.datetime) -> None:
+        # Swap in a new mapping instead of mutating, readers never see a partial update.
+        self._active = MappingProxyType(
+            {matcher.discount_code: matcher for matcher in self._matchers if matcher.is_valid(now)}
+        )
+        self._next_boundary = min(
+            (
+                boundary
+                for matcher in self._matchers
+                for boundary in (matcher.valid_from, matcher.valid_to)
+                if boundary > now
+            ),
+            default=None,
+        )
+
+
+@lru_cache()
+def get_discount_registry() -> DiscountRegistry:
+    return DiscountRegistry(refresh_seconds=get_settings().discounts_refresh_seconds)
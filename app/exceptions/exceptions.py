@@ -94,3 +94,28 @@ class ExcInvalidToken(HTTPException):
 class ExcExpiredToken(HTTPException):
     def __init__(self) -> None:
         super().__init__(status_code=401, detail="Token has expired.")
+
+
+class ExcInvalidCursor(HTTPException):
+    def __init__(self, cursor: str) -> None:
+        super().__init__(status_code=400, detail="Invalid or malformed pagination cursor.")
+        self.cursor = cursor
+
+
+class ExcAuthBusy(HTTPException):
+    def __init__(self, pending: int) -> None:
+        super().__init__(
+            status_code=503,
+            detail="Too many authentication requests in progress, try again later.",
+            headers={"Retry-After": "1"},
+        )
+        self.pending = pending
+
+
+class ExcIdempotencyKeyReused(HTTPException):
+    def __init__(self, idempotency_key: str) -> None:
+        super().__init__(
+            status_code=422,
+            detail=f"Idempotency key {idempotency_key} was already used with a different request.",
+        )
+        self.idempotency_key = idempotency_key
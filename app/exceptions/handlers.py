@@ -4,11 +4,14 @@ from fastapi.requests import Request
 from fastapi.responses import JSONResponse
 
 from app.exceptions.exceptions import (
+    ExcAuthBusy,
     ExcDeliveryOptionNotFound,
     ExcDiscountActiveNotFound,
     ExcExpiredToken,
+    ExcIdempotencyKeyReused,
     ExcInsufficientStock,
     ExcInvalidCredentials,
+    ExcInvalidCursor,
     ExcInvalidToken,
     ExcItemNotFound,
     ExcTransactionActiveNotFound,
@@ -229,6 +232,51 @@ async def exception_handler_token_expired(request: Request, exc: ExcExpiredToken
     )
 
 
+async def exception_handler_invalid_cursor(request: Request, exc: ExcInvalidCursor) -> JSONResponse:
+    log_error(logger, request.state.req_id, exc)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=dict(
+            error_code="INVALID_CURSOR",
+            message=exc.detail,
+            details={
+                "cursor": exc.cursor,
+            },
+        ),
+    )
+
+
+async def exception_handler_auth_busy(request: Request, exc: ExcAuthBusy) -> JSONResponse:
+    log_error(logger, request.state.req_id, exc)
+    return JSONResponse(
+        status_code=exc.status_code,
+        headers=exc.headers,
+        content=dict(
+            error_code="AUTH_BUSY",
+            message=exc.detail,
+            details={
+                "pending": exc.pending,
+            },
+        ),
+    )
+
+
+async def exception_handler_idempotency_key_reused(
+    request: Request, exc: ExcIdempotencyKeyReused
+) -> JSONResponse:
+    log_error(logger, request.state.req_id, exc)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=dict(
+            error_code="IDEMPOTENCY_KEY_REUSED",
+            message=exc.detail,
+            details={
+                "idempotency_key": exc.idempotency_key,
+            },
+        ),
+    )
+
+
 EXCEPTION_HANDLERS = {
     HTTPException: exception_handler_http,
     RequestValidationError: exception_handler_validation_error,
@@ -244,4 +292,7 @@ EXCEPTION_HANDLERS = {
     ExcInsufficientStock: exception_handler_insufficient_stock,
     ExcInvalidToken: exception_handler_invalid_token,
     ExcExpiredToken: exception_handler_token_expired,
+    ExcInvalidCursor: exception_handler_invalid_cursor,
+    ExcAuthBusy: exception_handler_auth_busy,
+    ExcIdempotencyKeyReused: exception_handler_idempotency_key_reused,
 }
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+from dataclasses import dataclass
+from functools import lru_cache
+import time
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import Pool
+
+from app.configs.utils import get_settings
+from app.database.utils import DATABASE_URL, get_engine, get_pool_limits
+from app.logger.utils import get_logger
+
+logger = get_logger()
+
+
+@dataclass(frozen=True, slots=True)
+class HealthState:
+    checked_at: float
+    db_error: str | None
+    db_latency_seconds: float | None
+    pool_checked_out: int
+    pool_capacity: int
+    loop_lag_seconds: float
+
+    @property
+    def pool_saturation(self) -> float:
+        return self.pool_checked_out / self.pool_capacity
+
+
+class HealthProber:
+    def __init__(
+        self,
+        pool: Pool,
+        pool_capacity: int,
+        probe_engine: AsyncEngine,
+        interval_seconds: float,
+        db_timeout_seconds: float,
+        max_pool_saturation: float,
+        max_loop_lag_seconds: float,
+    ) -> None:
+        self.pool = pool
+        self.pool_capacity = pool_capacity
+        # A connection of its own, so probes neither wait behind nor take from the
+        # request pool.
+        self.probe_engine = probe_engine
+        self.interval_seconds = interval_seconds
+        self.db_timeout_seconds = db_timeout_seconds
+        self.max_pool_saturation = max_pool_saturation
+        self.max_loop_lag_seconds = max_loop_lag_seconds
+        self.state: HealthState | None = None
+        self._task: asyncio.Task | None = None
+
+    async def probe_db(self) -> tuple[float | None, str | None]:
+        started_at = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.db_timeout_seconds):
+                async with self.probe_engine.connect() as conn:
+                    await conn.exec_driver_sql("SELECT 1")
+        except Exception as e:
+            return None, repr(e)
+        return time.perf_counter() - started_at, None
+
+    async def probe(self, loop_lag_seconds: float) -> HealthState:
+        db_latency_seconds, db_error = await self.probe_db()
+        return HealthState(
+            checked_at=time.monotonic(),
+            db_error=db_error,
+            db_latency_seconds=db_latency_seconds,
+            pool_checked_out=self.pool.checkedout(),
+            pool_capacity=self.pool_capacity,
+            loop_lag_seconds=loop_lag_seconds,
+        )
+
+    def update(self, state: HealthState) -> None:
+        if state.db_error and (self.state is None or not self.state.db_error):
+            logger.error(f"Health probe failed: {state.db_error}")
+        self.state = state
+
+    async def run(self) -> None:
+        while True:
+            # A loop blocked by other work wakes this sleep up late by as much.
+            started_at = time.monotonic()
+            await asyncio.sleep(self.interval_seconds)
+            loop_lag_seconds = max(time.monotonic() - started_at - self.interval_seconds, 0.0)
+            self.update(await self.probe(loop_lag_seconds))
+
+    async def start(self) -> None:
+        if self._task is None:
+            # Probed once up front, so the first readiness check has a state to answer from.
+            self.update(await self.probe(0.0))
+            self._task = asyncio.create_task(self.run(), name="health_prober")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.probe_engine.dispose()
+
+    def is_live(self) -> bool:
+        # The prober itself stalling or dying means the process needs a restart.
+        if self._task is None or self._task.done():
+            return False
+        state = self.state
+        max_age = 3 * self.interval_seconds + self.db_timeout_seconds
+        return state is None or time.monotonic() - state.checked_at <= max_age
+
+    def get_readiness_failures(self) -> list[str]:
+        state = self.state
+        if state is None:
+            return ["starting"]
+        failures = []
+        if state.db_error:
+            failures.append("database unreachable")
+        if state.pool_saturation >= self.max_pool_saturation:
+            failures.append("connection pool saturated")
+        if state.loop_lag_seconds >= self.max_loop_lag_seconds:
+            failures.append("event loop lagging")
+        if not self.is_live():
+            failures.append("health state stale")
+        return failures
+
+
+@lru_cache()
+def get_health_prober() -> HealthProber:
+    settings = get_settings()
+    pool_size, max_overflow = get_pool_limits(settings)
+    return HealthProber(
+        pool=get_engine().pool,
+        pool_capacity=pool_size + max_overflow,
+        probe_engine=create_async_engine(
+            DATABASE_URL, pool_size=1, max_overflow=0, pool_recycle=3600
+        ),
+        interval_seconds=settings.health_probe_interval_seconds,
+        db_timeout_seconds=settings.health_db_timeout_seconds,
+        max_pool_saturation=settings.health_max_pool_saturation,
+        max_loop_lag_seconds=settings.health_max_loop_lag_seconds,
+    )
@@ -1,30 +1,33 @@
 import datetime as dt
 from functools import lru_cache
-import json
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 import os
+import queue
+import time
 import traceback
 from typing import Any
 from uuid import UUID
 
+import orjson
+
 from app.configs.utils import get_settings
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 FILENAME_LOGS = "logs/app.log"
-if not os.path.exists(FILENAME_LOGS):
-    os.makedirs(os.path.dirname(FILENAME_LOGS), exist_ok=True)
-    with open(FILENAME_LOGS, "w", encoding="utf-8") as f:
-        f.write("")
 
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj: Any) -> str:
-        if isinstance(obj, dt.datetime):
-            return obj.isoformat()
-        return str(obj)
+def orjson_default(obj: Any) -> str:
+    return str(obj)
 
 
 class LogFormatterJson(logging.Formatter):
+    orjson_options = orjson.OPT_NON_STR_KEYS
+
     def format(self, record: Any) -> str:
         if not isinstance(record.msg, (str, dict)):
             record.msg = str(record.msg)
@@ -34,43 +37,137 @@ class LogFormatterJson(logging.Formatter):
             "log_type": "struct" if isinstance(record.msg, dict) else "string",
             "log": record.msg,
         }
-        return json.dumps(log_record, cls=CustomJSONEncoder)
+        return orjson.dumps(log_record, default=orjson_default, option=self.orjson_options).decode(
+            "utf-8"
+        )
+
+
+class LogFormatterTerminal(LogFormatterJson):
+    orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+
+
+class LogQueueHandler(QueueHandler):
+    # Records stay in-process, so skip QueueHandler's formatting into a string:
+    # dict messages must reach the listener's formatters intact.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Records from outside the lifespan, when no listener thread drains the queue,
+        # are written by its handlers right away.
+        if is_log_listener_running():
+            super().emit(record)
+        else:
+            get_log_listener().handle(record)
+
+
+class SharedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    # Worker processes append to the same file. Writes and rollovers hold an exclusive
+    # lock, the first worker past the rollover time rotates and the rest reopen.
+    def __init__(self, filename: str, **kwargs: Any) -> None:
+        super().__init__(filename, **kwargs)
+        self.lock_file = open(f"{self.baseFilename}.lock", "a", encoding="utf-8")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if fcntl is None:
+            super().emit(record)
+            return
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            super().emit(record)
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def is_rotated(self) -> bool:
+        if self.stream is None:
+            return False
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if not super().shouldRollover(record):
+            return False
+        if self.is_rotated():
+            self.stream.close()
+            self.stream = self._open()
+            self.rolloverAt = self.computeRollover(int(time.time()))
+            return False
+        return True
+
+    def close(self) -> None:
+        super().close()
+        self.lock_file.close()
 
 
-class LogFormatterTerminal(logging.Formatter):
-    def format(self, record: Any) -> str:
-        if not isinstance(record.msg, (str, dict)):
-            record.msg = str(record.msg)
-        log_record = {
-            "time_generated": self.formatTime(record, self.datefmt),
-            "level": record.levelname,
-            "log_type": "struct" if isinstance(record.msg, dict) else "string",
-            "log": record.msg,
-        }
-        return json.dumps(log_record, cls=CustomJSONEncoder, indent=4)
+@lru_cache()
+def get_log_queue() -> queue.SimpleQueue:
+    return queue.SimpleQueue()
 
 
 @lru_cache()
-def get_logger() -> logging.Logger:
+def get_log_listener() -> QueueListener:
     settings = get_settings()
 
-    logger = logging.getLogger(settings.logger_name)
-    logger.setLevel(settings.logger_level)
-
     # Console handler
     handler_stream = logging.StreamHandler()
     formatter_stream = LogFormatterTerminal()
     handler_stream.setFormatter(formatter_stream)
     handler_stream.setLevel(settings.logger_level)
-    logger.addHandler(handler_stream)
 
     # File handler
-    handler_file = TimedRotatingFileHandler(
+    os.makedirs(os.path.dirname(FILENAME_LOGS), exist_ok=True)
+    handler_file = SharedTimedRotatingFileHandler(
         FILENAME_LOGS, when="M", interval=5, utc=True, encoding="utf-8"
     )
     formatter_file = LogFormatterJson()
     handler_file.setFormatter(formatter_file)
-    logger.addHandler(handler_file)
+
+    return QueueListener(get_log_queue(), handler_stream, handler_file, respect_handler_level=True)
+
+
+def start_log_listener() -> None:
+    listener = get_log_listener()
+    if listener._thread is None:
+        listener.start()
+
+
+def is_log_listener_running() -> bool:
+    return bool(get_log_listener.cache_info().currsize) and get_log_listener()._thread is not None
+
+
+def stop_log_listener() -> None:
+    # Blocks until every queued record has been written.
+    if is_log_listener_running():
+        get_log_listener().stop()
+
+
+def _reset_log_listener_after_fork() -> None:
+    # Like the engine's fork hook, only runs under servers that fork after importing the
+    # app. The parent's listener thread does not survive a fork, and its file handler shares
+    # the parent's lock, so the child sets up a queue and handlers of its own.
+    if is_log_listener_running():
+        get_log_queue.cache_clear()
+        get_log_listener.cache_clear()
+        for handler in get_logger().handlers:
+            if isinstance(handler, LogQueueHandler):
+                handler.queue = get_log_queue()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_log_listener_after_fork)
+
+
+@lru_cache()
+def get_logger() -> logging.Logger:
+    settings = get_settings()
+
+    logger = logging.getLogger(settings.logger_name)
+    logger.setLevel(settings.logger_level)
+
+    # Request handlers only enqueue records, a listener thread formats and writes them.
+    logger.addHandler(LogQueueHandler(get_log_queue()))
 
     return logger
 
@@ -1,31 +1,78 @@
 from collections.abc import AsyncGenerator
 import contextlib
+import time
 from typing import Annotated
 
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlmodel import Session, text
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.auth.utils import get_password_hasher, get_token_cache
 from app.configs.datamodels import Settings
 from app.configs.utils import get_settings
-from app.database.utils import get_db_session
+from app.database.utils import get_engine
+from app.delivery.utils import refresh_delivery_options_snapshot
 from app.exceptions.handlers import EXCEPTION_HANDLERS
-from app.logger.utils import get_logger
+from app.health.utils import get_health_prober
+from app.logger.utils import get_logger, start_log_listener, stop_log_listener
+from app.metrics.utils import CONTENT_TYPE, get_metrics, render_metrics
 from app.middleware.middleware import CustomMiddleware
 from app.routers.auth import auth
 from app.routers.items import items
+from app.routers.items.utils import get_item_cache
 from app.routers.transactions import transactions
+from app.routers.transactions.utils import delete_expired_idempotency_keys, finalize_transactions
 from app.routers.user import user
+from app.scheduler.utils import get_scheduler
 
 logger = get_logger()
 
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    start_log_listener()
     logger.info("Starting up the API.")
+    settings = get_settings()
+    try:
+        await refresh_delivery_options_snapshot()
+    except Exception as e:
+        # Checkout falls back to loading the snapshot on first use.
+        logger.error(f"Loading delivery options failed: {e!r}")
+    scheduler = get_scheduler()
+    scheduler.add_job(
+        refresh_delivery_options_snapshot,
+        "interval",
+        seconds=settings.delivery_options_refresh_seconds,
+        id="refresh_delivery_options_snapshot",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        delete_expired_idempotency_keys,
+        "interval",
+        seconds=settings.idempotency_key_cleanup_seconds,
+        id="delete_expired_idempotency_keys",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        finalize_transactions,
+        "interval",
+        seconds=settings.finalizer_interval_seconds,
+        id="finalize_transactions",
+        replace_existing=True,
+    )
+    scheduler.start()
+    await get_health_prober().start()
     yield
     logger.info("Shutting down the API.")
+    await get_health_prober().stop()
+    get_health_prober.cache_clear()
+    scheduler.shutdown(wait=False)
+    get_scheduler.cache_clear()
+    get_password_hasher().shutdown()
+    get_password_hasher.cache_clear()
+    await get_engine().dispose()
+    get_engine.cache_clear()
+    stop_log_listener()
 
 
 app = FastAPI(
@@ -56,9 +103,57 @@ async def get_home(settings: Annotated[Settings, Depends(get_settings)]) -> JSON
 
 
 @app.get("/healthcheck", description="API healthcheck endpoint.", response_class=JSONResponse)
-async def get_healthcheck(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-) -> JSONResponse:
-    db.exec(text("SELECT 1 as test")).first()
+async def get_healthcheck(settings: Annotated[Settings, Depends(get_settings)]) -> JSONResponse:
+    state = get_health_prober().state
+    if state is None or state.db_error:
+        return JSONResponse(
+            status_code=503, content={"message": f"{settings.app_name} is unhealthy!"}
+        )
     return JSONResponse(status_code=200, content={"message": f"{settings.app_name} is healthy!"})
+
+
+@app.get("/livez", description="Liveness probe, answered from memory.", response_class=JSONResponse)
+async def get_livez() -> JSONResponse:
+    if not get_health_prober().is_live():
+        return JSONResponse(status_code=503, content={"status": "not live"})
+    return JSONResponse(status_code=200, content={"status": "live"})
+
+
+@app.get(
+    "/readyz",
+    description="Readiness probe, answered from the state of the background health prober.",
+    response_class=JSONResponse,
+)
+async def get_readyz() -> JSONResponse:
+    health_prober = get_health_prober()
+    failures = health_prober.get_readiness_failures()
+    state = health_prober.state
+    content = {
+        "status": "not ready" if failures else "ready",
+        "failures": failures,
+        "checks": {
+            "db_latency_seconds": state.db_latency_seconds,
+            "pool_saturation": state.pool_saturation,
+            "loop_lag_seconds": state.loop_lag_seconds,
+            "age_seconds": time.monotonic() - state.checked_at,
+        }
+        if state is not None
+        else None,
+    }
+    return JSONResponse(status_code=503 if failures else 200, content=content)
+
+
+@app.get("/metrics", description="Metrics in Prometheus text format.", include_in_schema=False)
+async def get_metrics_text() -> PlainTextResponse:
+    return PlainTextResponse(
+        render_metrics(
+            get_metrics(),
+            get_engine().pool,
+            caches={
+                "items": get_item_cache().get_stats(),
+                "auth_tokens": get_token_cache().get_stats(),
+            },
+            password_hasher=get_password_hasher().get_stats(),
+        ),
+        media_type=CONTENT_TYPE,
+    )
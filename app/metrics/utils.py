@@ -0,0 +1,176 @@
+from bisect import bisect_left
+from collections.abc import Mapping
+from functools import lru_cache
+import math
+
+from sqlalchemy.pool import QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CACHE_COUNTERS = ("hits", "misses", "evictions", "expirations", "invalidations")
+CACHE_GAUGES = ("size", "max_size")
+LABEL_VALUE_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        # One slot per bucket plus +Inf, made cumulative only when rendered.
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    # Not thread-safe: observations only come from the event loop, so recording is a
+    # few dict lookups and integer increments and never waits on a lock.
+
+    def __init__(self) -> None:
+        self.http_requests: dict[tuple[str, str, int], int] = {}
+        self.http_request_duration: dict[tuple[str, str], Histogram] = {}
+        self.db_pool_checkout = Histogram()
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float) -> None:
+        key = (method, route, status_code)
+        self.http_requests[key] = self.http_requests.get(key, 0) + 1
+        histogram = self.http_request_duration.get((method, route))
+        if histogram is None:
+            histogram = self.http_request_duration[(method, route)] = Histogram()
+        histogram.observe(seconds)
+
+
+@lru_cache()
+def get_metrics() -> Metrics:
+    return Metrics()
+
+
+def _labels(labels: Mapping[str, object]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).translate(LABEL_VALUE_ESCAPES)}"' for name, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def family(self, name: str, kind: str, description: str) -> None:
+        self.lines.append(f"# HELP {name} {description}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Mapping[str, object] | None = None) -> None:
+        self.lines.append(f"{name}{_labels(labels or {})} {_value(value)}")
+
+    def histogram(
+        self, name: str, histogram: Histogram, labels: Mapping[str, object] | None = None
+    ) -> None:
+        labels = labels or {}
+        cumulative = 0
+        for upper_bound, count in zip(
+            (*histogram.buckets, math.inf), histogram.counts, strict=True
+        ):
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, {**labels, "le": _value(upper_bound)})
+        self.sample(f"{name}_sum", histogram.sum, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(
+    metrics: Metrics,
+    pool: QueuePool,
+    caches: Mapping[str, Mapping[str, float]],
+    password_hasher: Mapping[str, float],
+) -> str:
+    writer = MetricsWriter()
+
+    writer.family("http_requests_total", "counter", "HTTP requests by route and status code.")
+    for (method, route, status_code), count in sorted(metrics.http_requests.items()):
+        writer.sample(
+            "http_requests_total",
+            count,
+            {"method": method, "route": route, "status_code": status_code},
+        )
+    writer.family("http_request_duration_seconds", "histogram", "HTTP request latency by route.")
+    for (method, route), histogram in sorted(metrics.http_request_duration.items()):
+        writer.histogram(
+            "http_request_duration_seconds", histogram, {"method": method, "route": route}
+        )
+
+    writer.family("db_pool_size", "gauge", "Connections kept open by the pool.")
+    writer.sample("db_pool_size", pool.size())
+    writer.family("db_pool_checked_out", "gauge", "Connections currently checked out.")
+    writer.sample("db_pool_checked_out", pool.checkedout())
+    writer.family("db_pool_checked_in", "gauge", "Idle connections in the pool.")
+    writer.sample("db_pool_checked_in", pool.checkedin())
+    writer.family("db_pool_overflow", "gauge", "Connections open beyond the pool size.")
+    writer.sample("db_pool_overflow", max(pool.overflow(), 0))
+    writer.family(
+        "db_pool_checkout_seconds",
+        "histogram",
+        "Time to check a connection out, including waiting for a free one and the pre-ping.",
+    )
+    writer.histogram("db_pool_checkout_seconds", metrics.db_pool_checkout)
+
+    for stat in CACHE_COUNTERS:
+        writer.family(f"cache_{stat}_total", "counter", f"Cache {stat}.")
+        for cache, stats in caches.items():
+            writer.sample(f"cache_{stat}_total", stats[stat], {"cache": cache})
+    for stat in CACHE_GAUGES:
+        writer.family(f"cache_{stat}", "gauge", f"Cache {stat.replace('_', ' ')}.")
+        for cache, stats in caches.items():
+            writer.sample(f"cache_{stat}", stats[stat], {"cache": cache})
+    writer.family("cache_hit_rate", "gauge", "Cache hits per lookup since startup.")
+    for cache, stats in caches.items():
+        lookups = stats["hits"] + stats["misses"]
+        writer.sample(
+            "cache_hit_rate", stats["hits"] / lookups if lookups else 0.0, {"cache": cache}
+        )
+    writer.family(
+        "cache_time_saved_seconds_total", "counter", "Work skipped by cache hits, estimated."
+    )
+    for cache, stats in caches.items():
+        if "time_saved_seconds_total" in stats:
+            writer.sample(
+                "cache_time_saved_seconds_total",
+                stats["time_saved_seconds_total"],
+                {"cache": cache},
+            )
+
+    writer.family(
+        "password_hasher_completed_total", "counter", "Password hashes and checks completed."
+    )
+    writer.sample("password_hasher_completed_total", password_hasher["completed"])
+    writer.family(
+        "password_hasher_rejected_total", "counter", "Password hashes and checks rejected as busy."
+    )
+    writer.sample("password_hasher_rejected_total", password_hasher["rejected"])
+    writer.family("password_hasher_pending", "gauge", "Password hashes and checks in flight.")
+    writer.sample("password_hasher_pending", password_hasher["pending"])
+    writer.family(
+        "password_hasher_queue_seconds_total", "counter", "Time spent waiting for a hasher thread."
+    )
+    writer.sample(
+        "password_hasher_queue_seconds_total", password_hasher["queue_time_seconds_total"]
+    )
+    writer.family("password_hasher_run_seconds_total", "counter", "Time spent hashing.")
+    writer.sample("password_hasher_run_seconds_total", password_hasher["run_time_seconds_total"])
+    return writer.render()
@@ -1,43 +1,121 @@
-from collections.abc import Callable
 import datetime as dt
-from uuid import uuid4
+import random
+import time
+from uuid import UUID, uuid4
 
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.configs.datamodels import Environment
+from app.configs.utils import get_settings
+from app.database.utils import QUERY_STATS, QueryStats
 from app.logger.utils import get_logger, log_error
+from app.metrics.utils import get_metrics
 
+settings = get_settings()
 logger = get_logger()
 
 
-class CustomMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> JSONResponse:
+class CustomMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         req_id = uuid4()
-        log = {
-            "timestamp": dt.datetime.now(dt.UTC).isoformat(),
-            "req_id": req_id,
-            "type": "request",
-            "method": request.method,
-            "url": str(request.url),
-        }
-        logger.info(log)
+        started_at = time.perf_counter()
+        query_stats = QueryStats()
+        state = scope.setdefault("state", {})
+        state["req_id"] = req_id
+        state["query_stats"] = query_stats
+        req_id_header = (b"x-request-id", str(req_id).encode("latin-1"))
+        status_code = 500
+        response_started = False
 
-        request.state.req_id = req_id
+        async def send_with_req_id(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                headers = [*message.get("headers", ()), req_id_header]
+                if settings.environment is Environment.DEVELOPMENT:
+                    db_time_ms = round(query_stats.duration * 1000, 3)
+                    headers.append((b"x-db-queries", str(query_stats.count).encode("latin-1")))
+                    headers.append((b"x-db-time-ms", str(db_time_ms).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        query_stats_token = QUERY_STATS.set(query_stats)
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_with_req_id)
         except Exception as e:
             log_error(logger, req_id, e)
+            if response_started:
+                # The status already sent does not describe a response cut short, e.g. a
+                # failure mid-stream, so it is recorded as a server error.
+                status_code = 500
+                raise
             response = JSONResponse(
                 status_code=500,
                 content={"error": "Internal Server Error"},
             )
-        response.headers["X-Request-ID"] = str(req_id)
+            await response(scope, receive, send_with_req_id)
+        finally:
+            QUERY_STATS.reset(query_stats_token)
+            self.record_request(
+                scope, req_id, status_code, time.perf_counter() - started_at, query_stats
+            )
+
+    def record_request(
+        self,
+        scope: Scope,
+        req_id: UUID,
+        status_code: int,
+        duration: float,
+        query_stats: QueryStats,
+    ) -> None:
+        # The matched route's path template keeps the label set bounded.
+        route = scope.get("route")
+        get_metrics().observe_request(
+            scope["method"], route.path if route is not None else "unmatched", status_code, duration
+        )
+        duration_ms = round(duration * 1000, 3)
+        db_time_ms = round(query_stats.duration * 1000, 3)
+
+        # The same statement issued over and over by one request is usually an N+1 loop.
+        repeated_queries = query_stats.get_repeated(settings.db_repeated_query_threshold)
+        if repeated_queries:
+            logger.warning(
+                {
+                    "timestamp": dt.datetime.now(dt.UTC).isoformat(),
+                    "req_id": req_id,
+                    "type": "repeated_queries",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "db_queries": query_stats.count,
+                    "db_time_ms": db_time_ms,
+                    "repeated_queries": repeated_queries,
+                }
+            )
+
+        # Server errors are always logged, everything else is sampled.
+        if status_code < 500 and random.random() >= settings.logger_access_log_sample_rate:
+            return
+        query_string = scope["query_string"]
         log = {
             "timestamp": dt.datetime.now(dt.UTC).isoformat(),
             "req_id": req_id,
-            "type": "response",
-            "status_code": response.status_code,
+            "type": "access",
+            "method": scope["method"],
+            "url": f"{scope['path']}?{query_string.decode('latin-1')}"
+            if query_string
+            else scope["path"],
+            "status_code": status_code,
+            "duration_ms": duration_ms,
+            "db_queries": query_stats.count,
+            "db_time_ms": db_time_ms,
         }
         logger.info(log)
-        return response
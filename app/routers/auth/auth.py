@@ -3,7 +3,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, status
 from fastapi.routing import APIRoute
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth.datamodels import ResponseGetToken
 from app.configs.datamodels import Settings
@@ -23,6 +23,6 @@ router = APIRouter(prefix="/v1/auth", tags=["Authentication"], route_class=APIRo
 async def req_get_token(
     form: Annotated[OAuth2PasswordRequestForm, Depends()],
     settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
 ) -> ResponseGetToken:
     return await get_token(settings=settings, db=db, form=form)
@@ -2,10 +2,11 @@ from typing import Annotated
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth.datamodels import ResponseGetToken
-from app.auth.utils import get_access_token, verify_password
+from app.auth.utils import get_access_token, get_password_hasher
 from app.configs.datamodels import Settings
 from app.configs.utils import get_settings
 from app.database.dbmodels import DBUser
@@ -15,17 +16,20 @@ from app.exceptions.exceptions import ExcInvalidCredentials
 
 async def get_token(
     settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
     form: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> ResponseGetToken:
     query = select(DBUser).where(DBUser.email == form.username)
-    db_user_matching = db.exec(query).first()
+    db_user_matching = (await db.exec(query)).first()
 
+    password_hasher = get_password_hasher()
     if db_user_matching:
-        password_valid = verify_password(form.password, db_user_matching.password_hash)
+        password_valid = await password_hasher.verify(form.password, db_user_matching.password_hash)
     else:
         password_valid = False
-        verify_password(form.password, "$2b$12$dummy.hash.to.prevent.timing.attack.here.xxx")
+        await password_hasher.verify(
+            form.password, "$2b$12$dummy.hash.to.prevent.timing.attack.here.xxx"
+        )
     if not password_valid:
         raise ExcInvalidCredentials()
 
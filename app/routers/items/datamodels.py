@@ -1,12 +1,19 @@
 from decimal import Decimal
+from enum import StrEnum
 from typing import Annotated
 import uuid
 
 from pydantic import BaseModel, Field
 
 
+class SearchMode(StrEnum):
+    SUBSTRING = "substring"
+    FULLTEXT = "fulltext"
+
+
 class ItemQuery(BaseModel):
     search: Annotated[str | None, Field(default=None)]
+    search_mode: Annotated[SearchMode, Field(default=SearchMode.SUBSTRING)]
     category: Annotated[str | None, Field(default=None)]
     subcategory: Annotated[list[str] | None, Field(default=None)]
     price: Annotated[
@@ -15,6 +22,8 @@ class ItemQuery(BaseModel):
     ]
     brand: Annotated[str | None, Field(default=None)]
     features: Annotated[dict | None, Field(default=None)]
+    limit: Annotated[int, Field(default=50, gt=0)]
+    cursor: Annotated[str | None, Field(default=None)]
 
 
 class ItemFiltered(BaseModel):
@@ -42,6 +51,7 @@ class ItemRetrieved(BaseModel):
 
 class ResponseFilterItems(BaseModel):
     items: Annotated[list[ItemFiltered], Field(...)]
+    next_cursor: Annotated[str | None, Field(default=None)]
 
 
 class ResponseRetrieveItem(BaseModel):
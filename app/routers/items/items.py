@@ -3,16 +3,19 @@ import uuid
 
 from fastapi import APIRouter, Depends, Path, Query, status
 from fastapi.routing import APIRoute
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.configs.datamodels import Settings
+from app.configs.utils import get_settings
 from app.database.utils import get_db_session
 from app.routers.items.datamodels import (
     ItemQuery,
     ResponseFilterItems,
     ResponseRetrieveItem,
 )
-from app.routers.items.service import filter_items, retrieve_item
+from app.routers.items.service import export_items, filter_items, retrieve_item
 from app.utils.openapi_examples import get_filter_items_examples, get_retrieve_item_examples
+from app.utils.responses import ModelResponse, NDJSONResponse
 
 router = APIRouter(prefix="/v1/items", tags=["Items"], route_class=APIRoute)
 
@@ -25,10 +28,14 @@ router = APIRouter(prefix="/v1/items", tags=["Items"], route_class=APIRoute)
     description="Query items based on various filters",
 )
 async def req_filter_items(
-    db: Annotated[Session, Depends(get_db_session)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
     item_query: Annotated[ItemQuery, Query(openapi_examples=get_filter_items_examples())],
-) -> ResponseFilterItems:
-    return await filter_items(item_query=item_query, db=db)
+) -> ModelResponse:
+    return ModelResponse(
+        await filter_items(settings=settings, item_query=item_query, db=db),
+        exclude_none=True,
+    )
 
 
 @router.get(
@@ -39,7 +46,19 @@ async def req_filter_items(
     description="Get item by its ID",
 )
 async def req_retrieve_item(
-    db: Annotated[Session, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
     item_id: Annotated[uuid.UUID, Path(..., openapi_examples=get_retrieve_item_examples())],
 ) -> ResponseRetrieveItem:
     return await retrieve_item(db=db, item_id=item_id)
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=NDJSONResponse,
+    description="Stream the whole catalog as newline-delimited JSON, one item per line",
+)
+async def req_export_items(
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> NDJSONResponse:
+    return NDJSONResponse(export_items(settings=settings))
@@ -1,52 +1,116 @@
+from collections.abc import AsyncIterator
 from typing import Annotated
 import uuid
 
 from fastapi import Depends, Path
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database.dbmodels import DBItem
-from app.database.utils import get_db_session
-from app.exceptions.exceptions import ExcItemNotFound
+from app.configs.datamodels import Settings
+from app.database.utils import async_session_factory, get_db_session
+from app.exceptions.exceptions import ExcInvalidCursor, ExcItemNotFound
 from app.routers.items.datamodels import (
     ItemQuery,
+    ItemRetrieved,
     ResponseFilterItems,
     ResponseRetrieveItem,
+    SearchMode,
 )
+from app.routers.items.utils import (
+    ITEM_FILTERED_COLUMNS,
+    ITEM_RETRIEVED_COLUMNS,
+    ITEMS,
+    cache_item,
+    decode_cursor,
+    encode_cursor,
+    get_cached_item,
+    get_fulltext_search,
+    get_item_cache,
+)
+from app.utils.responses import to_ndjson
 
 
 async def filter_items(
+    settings: Settings,
     item_query: ItemQuery,
-    db: Session,
+    db: AsyncSession,
 ) -> ResponseFilterItems:
-    query = select(DBItem)
-    if item_query.search:
+    limit = min(item_query.limit, settings.items_query_max_limit)
+    query = select(*ITEM_FILTERED_COLUMNS)
+    rank = None
+    if item_query.search and item_query.search_mode is SearchMode.FULLTEXT:
+        condition, rank = get_fulltext_search(item_query.search)
+        query = select(*ITEM_FILTERED_COLUMNS, rank.label("rank")).where(condition)
+    elif item_query.search:
         query = query.where(
-            DBItem.name.ilike(f"%{item_query.search}%")
-            | DBItem.description.ilike(f"%{item_query.search}%")
+            ITEMS.c.name.ilike(f"%{item_query.search}%")
+            | ITEMS.c.description.ilike(f"%{item_query.search}%")
         )
     if item_query.category:
-        query = query.where(DBItem.category == item_query.category)
+        query = query.where(ITEMS.c.category == item_query.category)
     if item_query.subcategory:
-        query = query.where(DBItem.subcategories.contains(item_query.subcategory))
+        query = query.where(ITEMS.c.subcategories.contains(item_query.subcategory))
     if item_query.price:
         if item_query.price[0]:
-            query = query.where(DBItem.price >= item_query.price[0])
+            query = query.where(ITEMS.c.price >= item_query.price[0])
         if item_query.price[1]:
-            query = query.where(DBItem.price <= item_query.price[1])
+            query = query.where(ITEMS.c.price <= item_query.price[1])
     if item_query.brand:
-        query = query.where(DBItem.brand == item_query.brand)
+        query = query.where(ITEMS.c.brand == item_query.brand)
+    if item_query.cursor:
+        cursor_item_id, cursor_rank = decode_cursor(item_query.cursor)
+        if rank is None:
+            query = query.where(ITEMS.c.item_id > cursor_item_id)
+        elif cursor_rank is not None:
+            query = query.where(
+                (rank < cursor_rank) | ((rank == cursor_rank) & (ITEMS.c.item_id > cursor_item_id))
+            )
+        else:
+            raise ExcInvalidCursor(cursor=item_query.cursor)
+    # One extra row tells whether another page exists without a COUNT query.
+    if rank is None:
+        query = query.order_by(ITEMS.c.item_id).limit(limit + 1)
+    else:
+        query = query.order_by(rank.desc(), ITEMS.c.item_id).limit(limit + 1)
+    rows = (await db.exec(query)).all()
 
-    return ResponseFilterItems(
-        items=[x.model_dump() for x in db.exec(query)],
+    next_cursor = None
+    if len(rows) > limit:
+        last_row = rows[limit - 1]
+        next_cursor = encode_cursor(last_row.item_id, last_row.rank if rank is not None else None)
+    # Validated straight from the rows, without an intermediate dict per item.
+    return ResponseFilterItems.model_validate(
+        {"items": rows[:limit], "next_cursor": next_cursor}, from_attributes=True
     )
 
 
 async def retrieve_item(
-    db: Annotated[Session, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
     item_id: Annotated[uuid.UUID, Path(...)],
 ) -> ResponseRetrieveItem:
-    query = select(DBItem).where(DBItem.item_id == item_id)
-    item = db.exec(query).first()
-    if not item:
-        raise ExcItemNotFound(item_id=item_id)
-    return ResponseRetrieveItem(item=item.model_dump())
+    item = get_cached_item(item_id)
+    if item is None:
+        invalidations = get_item_cache().stats.invalidations
+        query = select(*ITEM_RETRIEVED_COLUMNS).where(ITEMS.c.item_id == item_id)
+        item_row = (await db.exec(query)).first()
+        if not item_row:
+            raise ExcItemNotFound(item_id=item_id)
+        item = cache_item(item_row, invalidations)
+    return ResponseRetrieveItem(item=item)
+
+
+async def export_items(settings: Settings) -> AsyncIterator[bytes]:
+    query = (
+        select(*ITEM_RETRIEVED_COLUMNS)
+        .order_by(ITEMS.c.item_id)
+        .execution_options(yield_per=settings.export_batch_size)
+    )
+    # The session lives inside the generator, so its connection and server-side cursor
+    # are held only while the body streams and are released if the client disconnects.
+    async with async_session_factory() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield to_ndjson(
+                (ItemRetrieved.model_validate(row, from_attributes=True) for row in rows),
+                exclude_none=True,
+            )
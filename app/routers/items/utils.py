@@ -0,0 +1,84 @@
+import base64
+import binascii
+from functools import lru_cache
+import json
+import uuid
+
+from sqlalchemy import ColumnElement, Row, cast, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+
+from app.cache.utils import LRUCache
+from app.configs.utils import get_settings
+from app.database.dbmodels import DBItem
+from app.database.utils import get_columns
+from app.exceptions.exceptions import ExcInvalidCursor
+from app.routers.items.datamodels import ItemFiltered, ItemRetrieved
+
+ITEMS = DBItem.__table__
+# Read endpoints select only the columns their response needs.
+ITEM_FILTERED_COLUMNS = get_columns(DBItem, ItemFiltered.model_fields)
+ITEM_RETRIEVED_COLUMNS = get_columns(DBItem, [*ItemRetrieved.model_fields, "updated_at"])
+# Maintained by Postgres as a generated column, see postgres/CREATE_TABLES.sql.
+ITEMS_SEARCH_VECTOR = literal_column("items.search_vector", type_=TSVECTOR)
+ITEMS_SEARCH_CONFIG = "english"
+
+
+def get_fulltext_search(search: str) -> tuple[ColumnElement[bool], ColumnElement[float]]:
+    # Full-text matches are served by the GIN index on search_vector, typo-tolerant
+    # matches on the name by the trigram GIN index; both feed the relevance rank.
+    ts_query = func.websearch_to_tsquery(cast(ITEMS_SEARCH_CONFIG, REGCONFIG), search)
+    condition = ITEMS_SEARCH_VECTOR.bool_op("@@")(ts_query) | literal(search).bool_op("<%")(
+        ITEMS.c.name
+    )
+    rank = func.ts_rank_cd(ITEMS_SEARCH_VECTOR, ts_query) + func.word_similarity(
+        search, ITEMS.c.name
+    )
+    return condition, rank
+
+
+def encode_cursor(item_id: uuid.UUID, rank: float | None = None) -> str:
+    payload = {"item_id": str(item_id)}
+    if rank is not None:
+        payload["rank"] = rank
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[uuid.UUID, float | None]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        rank = payload.get("rank")
+        return uuid.UUID(payload["item_id"]), (float(rank) if rank is not None else None)
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ExcInvalidCursor(cursor=cursor) from e
+
+
+@lru_cache()
+def get_item_cache() -> LRUCache:
+    settings = get_settings()
+    return LRUCache(
+        max_size=settings.item_cache_max_size,
+        ttl_seconds=settings.item_cache_ttl_seconds,
+    )
+
+
+def get_cached_item(item_id: uuid.UUID) -> ItemRetrieved | None:
+    # Hits are not checked against items.updated_at, which would cost the query the cache
+    # saves. Checkouts in this process invalidate the items they sell, any other change is
+    # seen once the entry's TTL (item_cache_ttl_seconds) runs out.
+    entry = get_item_cache().get(item_id)
+    return entry[1] if entry is not None else None
+
+
+def cache_item(item_row: Row, invalidations: int) -> ItemRetrieved:
+    item_cache = get_item_cache()
+    item = ItemRetrieved.model_validate(item_row, from_attributes=True)
+    # Never replace a cached row version with an older one read concurrently.
+    cached = item_cache.peek(item_row.item_id)
+    if cached is None or cached[0] <= item_row.updated_at:
+        item_cache.set(item_row.item_id, (item_row.updated_at, item), invalidations=invalidations)
+    return item
+
+
+def invalidate_cached_items(item_ids: list[uuid.UUID]) -> None:
+    get_item_cache().invalidate(*item_ids)
@@ -6,7 +6,7 @@ from pydantic import BaseModel
 
 
 class TransactionToCreate(BaseModel):
-    item_ids: dict[str, int]
+    item_ids: dict[uuid.UUID, int]
     delivery_option_id: str
     discount_codes: list[str] = []
     name: str
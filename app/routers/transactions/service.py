@@ -1,65 +1,79 @@
+from collections.abc import AsyncIterator
 from decimal import ROUND_CEILING, Decimal
 import uuid
 
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.utils import validate_access_token
 from app.configs.datamodels import Settings
 from app.database.dbmodels import (
     DBTransaction,
     DBTransactionDiscount,
-    DBTransactionFinalized,
     DBTransactionItem,
 )
+from app.database.utils import async_session_factory
 from app.exceptions.exceptions import ExcTransactionActiveNotFound, ExcTransactionFinalizedNotFound
+from app.routers.items.utils import invalidate_cached_items
 from app.routers.transactions.datamodels import (
     ResponseGetAllCurrentTransactions,
     ResponseGetAllFinalizedTransactions,
     ResponseGetCurrentTransaction,
     ResponseGetFinalizedTransaction,
     TransactionCreated,
+    TransactionFinalized,
     TransactionItem,
     TransactionToCreate,
 )
 from app.routers.transactions.utils import (
+    TRANSACTIONS,
+    TRANSACTIONS_FINALIZED,
     apply_db_discounts,
-    check_for_db_item_snapshot,
-    get_db_delivery_options,
+    claim_idempotency_key,
     get_db_discounts,
-    get_db_item,
-    get_response_current_transaction,
-    update_db_item_stock,
+    get_db_items_for_update,
+    get_delivery_option,
+    get_request_hash,
+    get_response_current_transactions,
+    store_idempotent_response,
+    update_db_items_stock,
+    upsert_db_items_snapshots,
 )
+from app.utils.responses import to_ndjson
 
 
 async def create_transaction(
     settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
     req_body: TransactionToCreate,
+    idempotency_key: str | None = None,
 ) -> ResponseGetCurrentTransaction:
-    user_id: int = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
-    )
-    db_discounts = get_db_discounts(db, req_body.discount_codes)
-    db_delivery_options = get_db_delivery_options(db, req_body.delivery_option_id)
+    if idempotency_key:
+        stored_response = await claim_idempotency_key(
+            db,
+            user_id,
+            idempotency_key,
+            get_request_hash(req_body),
+            settings.idempotency_key_ttl_seconds,
+        )
+        if stored_response is not None:
+            await db.rollback()
+            return ResponseGetCurrentTransaction.model_validate(stored_response)
+
+    db_discounts = await get_db_discounts(db, req_body.discount_codes)
+    delivery_option = await get_delivery_option(db, req_body.delivery_option_id)
 
     transaction_id = uuid.uuid4()
 
+    items_db = await get_db_items_for_update(db, req_body.item_ids)
+    await update_db_items_stock(db, items_db, req_body.item_ids)
+    await upsert_db_items_snapshots(db, list(req_body.item_ids))
+
     db_transaction_items = []
     transaction_items = []
-    total_price = db_delivery_options.price
-    for item_id, item_count in req_body.item_ids.items():
-        item_db = get_db_item(db, item_id, item_count)
-        update_db_item_stock(
-            db,
-            item_id,
-            item_count,
-        )
-        check_for_db_item_snapshot(db, item_db)
-
+    total_price = delivery_option.price
+    for item_db in items_db:
+        item_count = req_body.item_ids[item_db.item_id]
         item_price = item_db.price
         price_after_discounts, applied_discounts = apply_db_discounts(
             item_db, item_price, db_discounts
@@ -93,8 +107,11 @@ async def create_transaction(
     )
     response_transaction_details = TransactionCreated(
         **db_transaction.model_dump(),
-        delivery_option=db_delivery_options.name,
-        delivery_price=db_delivery_options.price,
+        delivery_option=delivery_option.name,
+        delivery_price=delivery_option.price,
+    )
+    response = ResponseGetCurrentTransaction(
+        transaction=response_transaction_details, items=transaction_items
     )
     try:
         db.add(db_transaction)
@@ -108,109 +125,101 @@ async def create_transaction(
         ]
         db.add_all(transaction_db_discounts)
         db.add_all(db_transaction_items)
-        db.commit()
+        if idempotency_key:
+            await store_idempotent_response(
+                db, user_id, idempotency_key, response.model_dump(mode="json", exclude_none=True)
+            )
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
+    # Reads between the stock update and the commit may have cached the old stock.
+    invalidate_cached_items(list(req_body.item_ids))
 
-    return ResponseGetCurrentTransaction(
-        transaction=response_transaction_details, items=transaction_items
-    )
+    return response
 
 
 async def get_all_current_transactions(
-    settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
 ) -> ResponseGetAllCurrentTransactions:
-    user_id: int = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
+    query = (
+        select(*TRANSACTIONS.c)
+        .where(TRANSACTIONS.c.user_id == user_id)
+        .order_by(TRANSACTIONS.c.created_at)
     )
-    query = select(DBTransaction).where(DBTransaction.user_id == user_id)
-    db_transactions = db.exec(query)
+    transaction_rows = (await db.exec(query)).all()
 
-    delivery_options = dict()
-    response_transactions = []
-    for db_transaction in db_transactions:
-        response_transaction = get_response_current_transaction(
-            db,
-            db_transaction,
-            delivery_options,
-        )
-        response_transactions.append(response_transaction)
+    response_transactions = await get_response_current_transactions(db, transaction_rows)
     return ResponseGetAllCurrentTransactions(transactions=response_transactions)
 
 
 async def get_current_transaction(
-    settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
     transaction_id: uuid.UUID,
 ) -> ResponseGetCurrentTransaction:
-    user_id: int = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
+    query = select(*TRANSACTIONS.c).where(
+        (TRANSACTIONS.c.user_id == user_id) & (TRANSACTIONS.c.transaction_id == transaction_id)
     )
-    query = select(DBTransaction).where(
-        (DBTransaction.user_id == user_id) & (DBTransaction.transaction_id == transaction_id)
-    )
-    db_transaction = db.exec(query).first()
-    if not db_transaction:
+    transaction_row = (await db.exec(query)).first()
+    if not transaction_row:
         raise ExcTransactionActiveNotFound(
             transaction_id=transaction_id,
             user_id=user_id,
         )
 
-    response_transaction = get_response_current_transaction(
-        db,
-        db_transaction,
-    )
+    (response_transaction,) = await get_response_current_transactions(db, [transaction_row])
     return response_transaction
 
 
 async def get_all_finalized_transactions(
-    settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
 ) -> ResponseGetAllFinalizedTransactions:
-    user_id: int = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
-    )
-    query = select(DBTransactionFinalized).where(DBTransactionFinalized.user_id == user_id)
-    db_transactions = db.exec(query)
+    query = select(*TRANSACTIONS_FINALIZED.c).where(TRANSACTIONS_FINALIZED.c.user_id == user_id)
+    transaction_rows = (await db.exec(query)).all()
 
-    return ResponseGetAllFinalizedTransactions(
-        transactions=[
-            db_transaction.model_dump(exclude_none=True) for db_transaction in db_transactions
-        ]
+    return ResponseGetAllFinalizedTransactions.model_validate(
+        {"transactions": transaction_rows}, from_attributes=True
     )
 
 
 async def get_finalized_transaction(
-    settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
     transaction_id: uuid.UUID,
 ) -> ResponseGetFinalizedTransaction:
-    user_id: int = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
+    query = select(*TRANSACTIONS_FINALIZED.c).where(
+        (TRANSACTIONS_FINALIZED.c.user_id == user_id)
+        & (TRANSACTIONS_FINALIZED.c.transaction_id == transaction_id)
     )
-    query = select(DBTransactionFinalized).where(
-        (DBTransactionFinalized.user_id == user_id)
-        & (DBTransactionFinalized.transaction_id == transaction_id)
-    )
-    db_transaction = db.exec(query).first()
-    if not db_transaction:
+    transaction_row = (await db.exec(query)).first()
+    if not transaction_row:
         raise ExcTransactionFinalizedNotFound(
             transaction_id=transaction_id,
             user_id=user_id,
         )
 
-    return ResponseGetFinalizedTransaction(transaction=db_transaction.model_dump(exclude_none=True))
+    return ResponseGetFinalizedTransaction(
+        transaction=TransactionFinalized.model_validate(transaction_row, from_attributes=True)
+    )
+
+
+async def export_finalized_transactions(
+    settings: Settings,
+    user_id: uuid.UUID,
+) -> AsyncIterator[bytes]:
+    query = (
+        select(*TRANSACTIONS_FINALIZED.c)
+        .where(TRANSACTIONS_FINALIZED.c.user_id == user_id)
+        .order_by(TRANSACTIONS_FINALIZED.c.finalized_at)
+        .execution_options(yield_per=settings.export_batch_size)
+    )
+    async with async_session_factory() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield to_ndjson(
+                (TransactionFinalized.model_validate(row, from_attributes=True) for row in rows),
+                exclude_none=True,
+            )
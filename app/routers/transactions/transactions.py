@@ -1,11 +1,11 @@
 from typing import Annotated
 import uuid
 
-from fastapi import APIRouter, Body, Depends, Path, status
+from fastapi import APIRouter, Body, Depends, Header, Path, status
 from fastapi.routing import APIRoute
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.utils import oauth2_scheme
+from app.auth.utils import current_user
 from app.configs.datamodels import Settings
 from app.configs.utils import get_settings
 from app.database.utils import get_db_session
@@ -18,12 +18,14 @@ from app.routers.transactions.datamodels import (
 )
 from app.routers.transactions.service import (
     create_transaction,
+    export_finalized_transactions,
     get_all_current_transactions,
     get_all_finalized_transactions,
     get_current_transaction,
     get_finalized_transaction,
 )
 from app.utils.openapi_examples import get_transaction_create_examples
+from app.utils.responses import ModelResponse, NDJSONResponse
 
 router = APIRouter(prefix="/v1/transactions", tags=["Transactions"], route_class=APIRoute)
 
@@ -37,18 +39,27 @@ router = APIRouter(prefix="/v1/transactions", tags=["Transactions"], route_class
 )
 async def req_create_transaction(
     settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
     req_body: Annotated[
         TransactionToCreate,
         Body(..., openapi_examples=get_transaction_create_examples()),
     ],
+    idempotency_key: Annotated[
+        str | None,
+        Header(
+            min_length=1,
+            max_length=256,
+            description="Retries with the same key replay the first response.",
+        ),
+    ] = None,
 ) -> ResponseGetCurrentTransaction:
     return await create_transaction(
         settings=settings,
         db=db,
-        token=token,
+        user_id=user_id,
         req_body=req_body,
+        idempotency_key=idempotency_key,
     )
 
 
@@ -60,14 +71,15 @@ async def req_create_transaction(
     description="Route for retrieving current user's transactions",
 )
 async def req_get_all_current_transactions(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: str = Depends(oauth2_scheme),
-) -> ResponseGetAllCurrentTransactions:
-    return await get_all_current_transactions(
-        settings=settings,
-        db=db,
-        token=token,
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
+) -> ModelResponse:
+    return ModelResponse(
+        await get_all_current_transactions(
+            db=db,
+            user_id=user_id,
+        ),
+        exclude_none=True,
     )
 
 
@@ -79,17 +91,15 @@ async def req_get_all_current_transactions(
     description="Route for retrieving transaction status",
 )
 async def req_get_current_transaction(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
     transaction_id: Annotated[
         uuid.UUID, Path(..., description="The UUID of the transaction to retrieve")
     ],
 ) -> ResponseGetCurrentTransaction:
     return await get_current_transaction(
-        settings=settings,
         db=db,
-        token=token,
+        user_id=user_id,
         transaction_id=transaction_id,
     )
 
@@ -102,17 +112,32 @@ async def req_get_current_transaction(
     description="Route for retrieving current user's transactions",
 )
 async def req_get_all_finalized_transactions(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: str = Depends(oauth2_scheme),
-) -> ResponseGetAllFinalizedTransactions:
-    return await get_all_finalized_transactions(
-        settings=settings,
-        db=db,
-        token=token,
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
+) -> ModelResponse:
+    return ModelResponse(
+        await get_all_finalized_transactions(
+            db=db,
+            user_id=user_id,
+        ),
+        exclude_none=True,
     )
 
 
+# Registered before /finalized/{transaction_id}, which would otherwise match "export".
+@router.get(
+    "/finalized/export",
+    status_code=status.HTTP_200_OK,
+    response_class=NDJSONResponse,
+    description="Stream current user's finalized transactions as newline-delimited JSON",
+)
+async def req_export_finalized_transactions(
+    settings: Annotated[Settings, Depends(get_settings)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
+) -> NDJSONResponse:
+    return NDJSONResponse(export_finalized_transactions(settings=settings, user_id=user_id))
+
+
 @router.get(
     "/finalized/{transaction_id}",
     status_code=status.HTTP_200_OK,
@@ -121,16 +146,14 @@ async def req_get_all_finalized_transactions(
     description="Route for retrieving transaction status",
 )
 async def req_get_finalized_transaction(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
     transaction_id: Annotated[
         uuid.UUID, Path(..., description="The UUID of the transaction to retrieve")
     ],
 ) -> ResponseGetFinalizedTransaction:
     return await get_finalized_transaction(
-        settings=settings,
         db=db,
-        token=token,
+        user_id=user_id,
         transaction_id=transaction_id,
     )
@@ -1,116 +1,267 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+import datetime as dt
 from decimal import ROUND_CEILING, Decimal
+import hashlib
+from itertools import chain
+import json
+import time
 import uuid
 
-from sqlmodel import Session, insert, select, update
+from sqlalchemy import (
+    BindParameter,
+    ColumnElement,
+    FromClause,
+    Integer,
+    Row,
+    any_,
+    bindparam,
+    column,
+    exists,
+    func,
+    literal,
+    literal_column,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, aggregate_order_by, insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.configs.utils import get_settings
 from app.database.dbmodels import (
     DBDeliveryOptions,
-    DBDiscount,
+    DBIdempotencyKey,
     DBItem,
     DBItemSnapshot,
     DBTransaction,
     DBTransactionAction,
+    DBTransactionDiscount,
+    DBTransactionFinalized,
     DBTransactionItem,
 )
+from app.database.utils import async_session_factory
+from app.delivery.utils import DeliveryOption, get_delivery_options_snapshot
+from app.discounts.utils import DiscountMatcher, get_discount_registry
 from app.exceptions.exceptions import (
     ExcDeliveryOptionNotFound,
     ExcDiscountActiveNotFound,
+    ExcIdempotencyKeyReused,
     ExcInsufficientStock,
     ExcItemNotFound,
 )
+from app.logger.utils import get_logger
+from app.routers.items.utils import invalidate_cached_items
 from app.routers.transactions.datamodels import (
     ResponseGetCurrentTransaction,
     TransactionAction,
     TransactionCreated,
     TransactionItem,
+    TransactionToCreate,
 )
 
+TRANSACTIONS = DBTransaction.__table__
+TRANSACTIONS_FINALIZED = DBTransactionFinalized.__table__
+TRANSACTION_ITEMS = DBTransactionItem.__table__
+TRANSACTION_DISCOUNTS = DBTransactionDiscount.__table__
+TRANSACTION_ACTIONS = DBTransactionAction.__table__
+ITEMS_SNAPSHOTS = DBItemSnapshot.__table__
+DELIVERY_OPTIONS = DBDeliveryOptions.__table__
+# The last action of a completed transaction, see postgres/INSERT_MOCK_DATA.sql.
+FINALIZED_ACTION = "REQUEST FINALIZED"
+
+logger = get_logger()
+
+
+def _uuid_array(item_ids: Iterable[uuid.UUID]) -> BindParameter:
+    # A single array parameter keeps the statement text identical for any cart
+    # size, so the driver can reuse one prepared statement.
+    return bindparam("item_ids", list(item_ids), type_=ARRAY(UUID(as_uuid=True)))
+
+
+def get_request_hash(req_body: TransactionToCreate) -> str:
+    payload = json.dumps(req_body.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def claim_idempotency_key(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    idempotency_key: str,
+    request_hash: str,
+    ttl_seconds: int,
+) -> dict | None:
+    # Claims the key inside the checkout's DB transaction. A concurrent request with the
+    # same key blocks on the primary key until this transaction commits or rolls back,
+    # then finds the stored response or claims the key itself.
+    created_at = dt.datetime.now(dt.timezone.utc)
+    query = insert(DBIdempotencyKey).values(
+        user_id=user_id,
+        idempotency_key=idempotency_key,
+        request_hash=request_hash,
+        created_at=created_at,
+        expires_at=created_at + dt.timedelta(seconds=ttl_seconds),
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[DBIdempotencyKey.user_id, DBIdempotencyKey.idempotency_key],
+        set_=dict(
+            request_hash=query.excluded.request_hash,
+            response=None,
+            created_at=query.excluded.created_at,
+            expires_at=query.excluded.expires_at,
+        ),
+        where=DBIdempotencyKey.expires_at <= created_at,
+    ).returning(DBIdempotencyKey.user_id)
+    if (await db.exec(query)).first():
+        return None
+
+    query = select(DBIdempotencyKey).where(
+        (DBIdempotencyKey.user_id == user_id)
+        & (DBIdempotencyKey.idempotency_key == idempotency_key)
+    )
+    idempotency_key_db = (await db.exec(query)).one()
+    if idempotency_key_db.request_hash != request_hash:
+        raise ExcIdempotencyKeyReused(idempotency_key=idempotency_key)
+    return idempotency_key_db.response
+
+
+async def store_idempotent_response(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    idempotency_key: str,
+    response: dict,
+) -> None:
+    query = (
+        update(DBIdempotencyKey)
+        .where(
+            (DBIdempotencyKey.user_id == user_id)
+            & (DBIdempotencyKey.idempotency_key == idempotency_key)
+        )
+        .values(response=response)
+    )
+    await db.exec(query)
+
+
+async def delete_expired_idempotency_keys() -> None:
+    async with async_session_factory() as db:
+        query = delete(DBIdempotencyKey).where(
+            DBIdempotencyKey.expires_at <= dt.datetime.now(dt.timezone.utc)
+        )
+        await db.exec(query)
+        await db.commit()
+
 
-def get_db_discounts(
-    db: Session,
-    discount_codes: list[DBDiscount],
-) -> list[DBDiscount]:
-    discounts_db = []
+async def get_db_discounts(
+    db: AsyncSession,
+    discount_codes: list[str],
+) -> list[DiscountMatcher]:
     if not discount_codes:
-        return discounts_db
+        return []
+    active_discounts = await get_discount_registry().get_active(db)
+    discount_codes = list(dict.fromkeys(discount_codes))
     for discount_code in discount_codes:
-        query = select(DBDiscount).where(DBDiscount.discount_code == discount_code)
-        discount_db = db.exec(query).first()
-        if not discount_db:
+        if discount_code not in active_discounts:
             raise ExcDiscountActiveNotFound(discount_code=discount_code)
-        discounts_db.append(discount_db)
-    return discounts_db
+    return [active_discounts[discount_code] for discount_code in discount_codes]
 
 
-def get_db_delivery_options(
-    db: Session,
-    delivery_option_id: uuid.UUID,
-) -> DBDeliveryOptions:
-    query = select(DBDeliveryOptions).where(DBDeliveryOptions.option_id == delivery_option_id)
-    delivery_option_db = db.exec(query).first()
-    if not delivery_option_db:
+async def get_delivery_option(
+    db: AsyncSession,
+    delivery_option_id: uuid.UUID | str,
+) -> DeliveryOption:
+    try:
+        option_id = uuid.UUID(str(delivery_option_id))
+    except ValueError as e:
+        raise ExcDeliveryOptionNotFound(delivery_option_id=delivery_option_id) from e
+    delivery_options = await get_delivery_options_snapshot().get_many(db, [option_id])
+    if option_id not in delivery_options:
         raise ExcDeliveryOptionNotFound(delivery_option_id=delivery_option_id)
-    return delivery_option_db
-
-
-def get_db_item(
-    db: Session,
-    item_id: uuid.UUID,
-    item_count: int,
-) -> DBItem:
-    query = select(DBItem).where(DBItem.item_id == item_id)
-    item_db = db.exec(query).first()
-    if not item_db:
-        raise ExcItemNotFound(item_id=item_id)
-    elif item_db.stock < item_count:
-        raise ExcInsufficientStock(item_id=item_id, requested=item_count, available=item_db.stock)
-    return item_db
+    return delivery_options[option_id]
+
+
+async def get_db_items_for_update(
+    db: AsyncSession,
+    item_counts: dict[uuid.UUID, int],
+) -> list[DBItem]:
+    # Rows are locked in primary key order so concurrent checkouts of overlapping
+    # carts queue up instead of deadlocking.
+    query = (
+        select(DBItem)
+        .where(DBItem.item_id == any_(_uuid_array(item_counts)))
+        .order_by(DBItem.item_id)
+        .with_for_update()
+    )
+    items_db = {item_db.item_id: item_db for item_db in await db.exec(query)}
+    for item_id, item_count in item_counts.items():
+        item_db = items_db.get(item_id)
+        if not item_db:
+            raise ExcItemNotFound(item_id=item_id)
+        elif item_db.stock < item_count:
+            raise ExcInsufficientStock(
+                item_id=item_id, requested=item_count, available=item_db.stock
+            )
+    return [items_db[item_id] for item_id in item_counts]
 
 
-def update_db_item_stock(
-    db: Session,
-    item_id: uuid.UUID,
-    item_count: int,
+async def update_db_items_stock(
+    db: AsyncSession,
+    items_db: list[DBItem],
+    item_counts: dict[uuid.UUID, int],
 ) -> None:
+    cart = (
+        func.unnest(
+            _uuid_array(item_counts),
+            bindparam("counts", list(item_counts.values()), type_=ARRAY(Integer)),
+        )
+        .table_valued(column("item_id", UUID(as_uuid=True)), column("count", Integer))
+        .render_derived(name="cart")
+    )
     query = (
-        update(DBItem).where(DBItem.item_id == item_id).values(stock=(DBItem.stock - item_count))
+        update(DBItem)
+        .where((DBItem.item_id == cart.c.item_id) & (DBItem.stock >= cart.c.count))
+        .values(stock=DBItem.stock - cart.c.count)
+        .returning(DBItem.item_id)
+        .execution_options(synchronize_session=False)
     )
-    db.exec(query)
+    updated_item_ids = set((await db.exec(query)).scalars())
+    invalidate_cached_items(list(item_counts))
+    # Any line left out fails the checkout, whose rollback restores the lines updated.
+    items_db_by_id = {item_db.item_id: item_db for item_db in items_db}
+    for item_id, item_count in item_counts.items():
+        if item_id in updated_item_ids:
+            continue
+        item_db = items_db_by_id.get(item_id)
+        if not item_db:
+            raise ExcItemNotFound(item_id=item_id)
+        raise ExcInsufficientStock(item_id=item_id, requested=item_count, available=item_db.stock)
 
 
-def check_for_db_item_snapshot(
-    db: Session,
-    item_db: DBItem,
+async def upsert_db_items_snapshots(
+    db: AsyncSession,
+    item_ids: list[uuid.UUID],
 ) -> None:
-    query = select(DBItemSnapshot).where(
-        (DBItemSnapshot.item_id == item_db.item_id)
-        & (DBItemSnapshot.updated_at == item_db.updated_at)
+    columns = [column.name for column in DBItemSnapshot.__table__.columns]
+    query = (
+        insert(DBItemSnapshot)
+        .from_select(
+            columns,
+            select(*(DBItem.__table__.c[name] for name in columns)).where(
+                DBItem.item_id == any_(_uuid_array(item_ids))
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=["item_id", "updated_at"])
     )
-    item_snapshot_db = db.exec(query).first()
-    if not item_snapshot_db:
-        query = insert(DBItemSnapshot).values(item_db.model_dump(exclude={"stock"}))
-        db.exec(query)
+    await db.exec(query)
 
 
 def apply_db_discounts(
     item_db: DBItem,
     item_price: Decimal,
-    discounts_db: list[DBDiscount],
+    discounts: list[DiscountMatcher],
 ) -> tuple[Decimal, list[dict]]:
     applied_discounts = []
-    for discount in discounts_db:
-        if discount.item_ids and item_db.item_id not in discount.item_ids:
-            continue
-        elif (
-            (discount.item_ids and item_db.item_id not in discount.item_ids)
-            or (discount.brands and item_db.brand not in discount.brands)
-            or (discount.categories and item_db.category not in discount.categories)
-            or (
-                discount.categories
-                and item_db.category in discount.categories
-                and not set(item_db.subcategories) & set(discount.categories[item_db.category])
-            )
-        ):
+    for discount in discounts:
+        if not discount.matches(item_db):
             continue
         applied_discounts.append(
             dict(
@@ -119,61 +270,225 @@ def apply_db_discounts(
             )
         )
 
-        item_price *= 1 - (discount.discount_percentage / 100)
+        item_price *= discount.multiplier
     price_after_discounts = item_price.quantize(Decimal("0.01"), rounding=ROUND_CEILING)
     return price_after_discounts, applied_discounts
 
 
-def get_response_current_transaction(
-    db: Session,
-    transaction_db: DBTransaction,
-    delivery_options: dict[uuid.UUID, DBDeliveryOptions] | None = None,
-) -> ResponseGetCurrentTransaction:
-    if not delivery_options:
-        delivery_options = {}
-    delivery_option = delivery_options.get(transaction_db.delivery_option_id)
-    if not delivery_option:
-        query = select(DBDeliveryOptions).where(
-            DBDeliveryOptions.option_id == transaction_db.delivery_option_id
-        )
-    delivery_option_db = db.exec(query).first()
-    query = select(DBTransactionItem).where(
-        DBTransactionItem.transaction_id == transaction_db.transaction_id
-    )
-    transaction_items_db = db.exec(query)
-
-    response_transaction_items = []
-    for transaction_item_db in transaction_items_db:
-        query = select(DBItemSnapshot).where(DBItemSnapshot.item_id == transaction_item_db.item_id)
-        item_db = db.exec(query).first()
-        response_transaction_item = TransactionItem(
-            **item_db.model_dump(),
-            **transaction_item_db.model_dump(exclude={"item_id", "updated_at"}),
-            price_unit=item_db.price,
-        )
-        response_transaction_items.append(response_transaction_item)
-
-    response_transaction_actions = []
-    query = select(DBTransactionAction).where(
-        DBTransactionAction.transaction_id == transaction_db.transaction_id
-    )
-    transaction_actions_db = db.exec(query)
-    for transaction_action_db in transaction_actions_db:
-        response_transaction_action = TransactionAction(
-            action=transaction_action_db.action,
-            description=transaction_action_db.description,
-            performed_at=transaction_action_db.performed_at,
-        )
-        response_transaction_actions.append(response_transaction_action)
-
-    response_transaction_details = TransactionCreated(
-        **transaction_db.model_dump(),
-        **delivery_option_db.model_dump(exclude={"name"}),
-        delivery_option=delivery_option_db.name,
-        delivery_price=delivery_option_db.price,
-    )
-    return ResponseGetCurrentTransaction(
-        transaction=response_transaction_details,
-        items=response_transaction_items,
-        actions=response_transaction_actions,
+async def get_response_current_transactions(
+    db: AsyncSession,
+    transaction_rows: Sequence[Row],
+) -> list[ResponseGetCurrentTransaction]:
+    if not transaction_rows:
+        return []
+    transaction_ids = bindparam(
+        "transaction_ids",
+        [transaction_row.transaction_id for transaction_row in transaction_rows],
+        type_=ARRAY(UUID(as_uuid=True)),
+    )
+
+    delivery_options = await get_delivery_options_snapshot().get_many(
+        db, (transaction_row.delivery_option_id for transaction_row in transaction_rows)
+    )
+
+    query = (
+        select(
+            TRANSACTION_ITEMS.c.transaction_id,
+            TRANSACTION_ITEMS.c.item_id,
+            TRANSACTION_ITEMS.c.updated_at,
+            ITEMS_SNAPSHOTS.c.name,
+            ITEMS_SNAPSHOTS.c.price.label("price_unit"),
+            TRANSACTION_ITEMS.c.price_after_discounts,
+            TRANSACTION_ITEMS.c.count,
+        )
+        # An inner join drops no lines: the foreign key on (item_id, updated_at) means
+        # every line item has its snapshot.
+        .join(
+            ITEMS_SNAPSHOTS,
+            (ITEMS_SNAPSHOTS.c.item_id == TRANSACTION_ITEMS.c.item_id)
+            & (ITEMS_SNAPSHOTS.c.updated_at == TRANSACTION_ITEMS.c.updated_at),
+        )
+        .where(TRANSACTION_ITEMS.c.transaction_id == any_(transaction_ids))
+        .order_by(TRANSACTION_ITEMS.c.row_id)
+    )
+    response_transaction_items = defaultdict(list)
+    for transaction_item_row in await db.exec(query):
+        response_transaction_items[transaction_item_row.transaction_id].append(
+            TransactionItem.model_validate(transaction_item_row, from_attributes=True)
+        )
+
+    query = (
+        select(
+            TRANSACTION_ACTIONS.c.transaction_id,
+            TRANSACTION_ACTIONS.c.action,
+            TRANSACTION_ACTIONS.c.description,
+            TRANSACTION_ACTIONS.c.performed_at,
+        )
+        .where(TRANSACTION_ACTIONS.c.transaction_id == any_(transaction_ids))
+        .order_by(TRANSACTION_ACTIONS.c.performed_at)
     )
+    response_transaction_actions = defaultdict(list)
+    for transaction_action_row in await db.exec(query):
+        response_transaction_actions[transaction_action_row.transaction_id].append(
+            TransactionAction.model_validate(transaction_action_row, from_attributes=True)
+        )
+
+    response_transactions = []
+    for transaction_row in transaction_rows:
+        delivery_option = delivery_options[transaction_row.delivery_option_id]
+        response_transaction_details = TransactionCreated(
+            **transaction_row._mapping,
+            delivery_option=delivery_option.name,
+            delivery_price=delivery_option.price,
+        )
+        response_transactions.append(
+            ResponseGetCurrentTransaction(
+                transaction=response_transaction_details,
+                items=response_transaction_items[transaction_row.transaction_id],
+                actions=response_transaction_actions[transaction_row.transaction_id],
+            )
+        )
+    return response_transactions
+
+
+def _jsonb_object(*columns: ColumnElement) -> ColumnElement:
+    return func.jsonb_build_object(*chain.from_iterable((literal(c.name), c) for c in columns))
+
+
+def _jsonb_array(
+    document: ColumnElement,
+    order_by: ColumnElement,
+    from_clause: FromClause,
+    transaction_id: ColumnElement,
+) -> ColumnElement:
+    # Aggregates the rows of the outer query's transaction into one JSONB array.
+    return (
+        select(
+            func.coalesce(
+                func.jsonb_agg(aggregate_order_by(document, order_by)),
+                literal_column("'[]'::jsonb"),
+            )
+        )
+        .select_from(from_clause)
+        .where(transaction_id == TRANSACTIONS.c.transaction_id)
+        .scalar_subquery()
+    )
+
+
+async def finalize_transactions_batch(db: AsyncSession, batch_size: int) -> int:
+    # Completed transactions are locked with SKIP LOCKED, so concurrent finalizers take
+    # disjoint batches. Their documents are built and moved in one DB transaction.
+    # Only a transaction's first request is a candidate, so repeated requests neither
+    # take up slots of the batch nor make a full batch look like the queue's end.
+    earlier_request = TRANSACTION_ACTIONS.alias("earlier_request")
+    query = (
+        select(TRANSACTIONS.c.transaction_id)
+        .join(
+            TRANSACTION_ACTIONS,
+            TRANSACTION_ACTIONS.c.transaction_id == TRANSACTIONS.c.transaction_id,
+        )
+        .where(TRANSACTION_ACTIONS.c.action == FINALIZED_ACTION)
+        .where(
+            ~exists().where(
+                (earlier_request.c.transaction_id == TRANSACTION_ACTIONS.c.transaction_id)
+                & (earlier_request.c.action == FINALIZED_ACTION)
+                & (
+                    tuple_(earlier_request.c.performed_at, earlier_request.c.action_id)
+                    < tuple_(TRANSACTION_ACTIONS.c.performed_at, TRANSACTION_ACTIONS.c.action_id)
+                )
+            )
+        )
+        .order_by(TRANSACTION_ACTIONS.c.performed_at)
+        .limit(batch_size)
+        .with_for_update(of=TRANSACTIONS, skip_locked=True)
+    )
+    transaction_ids = list(await db.exec(query))
+    if not transaction_ids:
+        return 0
+    transaction_ids_param = bindparam(
+        "transaction_ids", transaction_ids, type_=ARRAY(UUID(as_uuid=True))
+    )
+
+    finalized_at = (
+        select(func.max(TRANSACTION_ACTIONS.c.performed_at))
+        .where(
+            (TRANSACTION_ACTIONS.c.transaction_id == TRANSACTIONS.c.transaction_id)
+            & (TRANSACTION_ACTIONS.c.action == FINALIZED_ACTION)
+        )
+        .scalar_subquery()
+    )
+    items = _jsonb_array(
+        _jsonb_object(
+            *ITEMS_SNAPSHOTS.c,
+            TRANSACTION_ITEMS.c.count,
+            TRANSACTION_ITEMS.c.price_after_discounts,
+        ),
+        TRANSACTION_ITEMS.c.row_id,
+        TRANSACTION_ITEMS.join(
+            ITEMS_SNAPSHOTS,
+            (ITEMS_SNAPSHOTS.c.item_id == TRANSACTION_ITEMS.c.item_id)
+            & (ITEMS_SNAPSHOTS.c.updated_at == TRANSACTION_ITEMS.c.updated_at),
+        ),
+        TRANSACTION_ITEMS.c.transaction_id,
+    )
+    action_history = _jsonb_array(
+        _jsonb_object(*TRANSACTION_ACTIONS.c),
+        TRANSACTION_ACTIONS.c.performed_at,
+        TRANSACTION_ACTIONS,
+        TRANSACTION_ACTIONS.c.transaction_id,
+    )
+    documents = (
+        select(
+            *(
+                TRANSACTIONS.c[name]
+                for name in TRANSACTIONS_FINALIZED.c.keys()
+                if name in TRANSACTIONS.c
+            ),
+            finalized_at.label("finalized_at"),
+            _jsonb_object(*DELIVERY_OPTIONS.c).label("delivery"),
+            items.label("items"),
+            action_history.label("action_history"),
+        )
+        .join(DELIVERY_OPTIONS, DELIVERY_OPTIONS.c.option_id == TRANSACTIONS.c.delivery_option_id)
+        .where(TRANSACTIONS.c.transaction_id == any_(transaction_ids_param))
+    )
+    try:
+        await db.exec(
+            insert(DBTransactionFinalized).from_select(
+                [c.name for c in documents.selected_columns], documents
+            )
+        )
+        await db.exec(
+            delete(TRANSACTION_DISCOUNTS).where(
+                TRANSACTION_DISCOUNTS.c.transaction_id == any_(transaction_ids_param)
+            )
+        )
+        # Line items and actions go with their transactions, ON DELETE CASCADE.
+        await db.exec(
+            delete(TRANSACTIONS).where(TRANSACTIONS.c.transaction_id == any_(transaction_ids_param))
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise e
+    return len(transaction_ids)
+
+
+async def finalize_transactions() -> None:
+    settings = get_settings()
+    batch_size = settings.finalizer_batch_size
+    started_at = time.monotonic()
+    finalized = 0
+    while True:
+        async with async_session_factory() as db:
+            count = await finalize_transactions_batch(db, batch_size)
+        finalized += count
+        if count < batch_size:
+            break
+        # Batches are paced to the target rate, and the run ends before the next one is due.
+        next_batch_at = started_at + finalized / settings.finalizer_target_per_second
+        if next_batch_at - started_at >= settings.finalizer_interval_seconds:
+            break
+        await asyncio.sleep(max(0.0, next_batch_at - time.monotonic()))
+    if finalized:
+        logger.info(f"Finalized {finalized} transactions in {time.monotonic() - started_at:.3f} s.")
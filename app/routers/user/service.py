@@ -1,9 +1,10 @@
 import datetime as dt
+import uuid
 
-from sqlmodel import Session, delete, select, update
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.utils import get_password_hash, validate_access_token
-from app.configs.datamodels import Settings
+from app.auth.utils import get_password_hasher
 from app.database.dbmodels import DBTransaction, DBUser
 from app.exceptions.exceptions import (
     ExcTransactionsActiveFound,
@@ -22,31 +23,32 @@ from app.routers.user.datamodels import (
 )
 
 
-async def create_user(db: Session, user_req: UserToCreate) -> ResponseCreateUser:
+async def create_user(db: AsyncSession, user_req: UserToCreate) -> ResponseCreateUser:
     query = select(DBUser).where(
         (DBUser.email == user_req.email) | (DBUser.phone == user_req.phone)
     )
-    user_db: DBUser | None = db.exec(query).first()
+    user_db: DBUser | None = (await db.exec(query)).first()
     if user_db:
         raise ExcUserExists(
             email=(user_req.email if user_db.email == user_req.email else None),
             phone=(user_req.phone if user_db.phone == user_req.phone else None),
         )
 
+    password_hash = await get_password_hasher().hash(user_req.password)
     try:
         created_at = dt.datetime.now(dt.timezone.utc)
         user_db = DBUser(
             email=user_req.email,
             phone=user_req.phone,
-            password_hash=get_password_hash(user_req.password),
+            password_hash=password_hash,
             created_at=created_at,
             updated_at=created_at,
         )
         db.add(user_db)
-        db.commit()
-        db.refresh(user_db)
+        await db.commit()
+        await db.refresh(user_db)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
     return ResponseCreateUser(
@@ -57,18 +59,12 @@ async def create_user(db: Session, user_req: UserToCreate) -> ResponseCreateUser
 
 
 async def update_user(
-    settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
     user: UserToUpdate,
 ) -> ResponseUpdateUser:
-    user_id = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
-    )
     query = select(DBUser).where(DBUser.user_id == user_id)
-    user_db = db.exec(query).first()
+    user_db = (await db.exec(query)).first()
     if not user_db:
         raise ExcUserNotFound(
             user_id=user_id,
@@ -79,14 +75,14 @@ async def update_user(
         **user.model_dump(exclude_none=True),
     )
     if user.password:
-        user_db_update["password_hash"] = get_password_hash(user.password)
+        user_db_update["password_hash"] = await get_password_hasher().hash(user.password)
     try:
         query = update(DBUser).where(DBUser.user_id == user_id).values(user_db_update)
-        db.exec(query)
-        db.commit()
-        db.refresh(user_db)
+        await db.exec(query)
+        await db.commit()
+        await db.refresh(user_db)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
     return ResponseUpdateUser(
@@ -100,18 +96,11 @@ async def update_user(
 
 
 async def remove_user(
-    settings: Settings,
-    db: Session,
-    token: str,
+    db: AsyncSession,
+    user_id: uuid.UUID,
 ) -> ResponseRemoveUser:
-    user_id = validate_access_token(
-        token=token,
-        secret_key=settings.auth_secret_key,
-        algorithms=[settings.auth_algorithm],
-    )
-
     query = select(DBUser).where(DBUser.user_id == user_id)
-    user_db = db.exec(query).first()
+    user_db = (await db.exec(query)).first()
     if not user_db:
         raise ExcUserNotFound(user_id=user_id)
 
@@ -119,7 +108,7 @@ async def remove_user(
     phone = user_db.phone
 
     query = select(DBTransaction).where(DBTransaction.user_id == user_id)
-    db_user_transactions = db.exec(query).all()
+    db_user_transactions = (await db.exec(query)).all()
     if db_user_transactions:
         raise ExcTransactionsActiveFound(
             user_id=user_id,
@@ -128,10 +117,10 @@ async def remove_user(
 
     try:
         query = delete(DBUser).where(DBUser.user_id == user_id)
-        db.exec(query)
-        db.commit()
+        await db.exec(query)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
     return ResponseRemoveUser(
@@ -1,12 +1,11 @@
 from typing import Annotated
+import uuid
 
 from fastapi import APIRouter, Body, Depends, status
 from fastapi.routing import APIRoute
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.utils import oauth2_scheme
-from app.configs.datamodels import Settings
-from app.configs.utils import get_settings
+from app.auth.utils import current_user
 from app.database.utils import get_db_session
 from app.routers.user.datamodels import (
     ResponseCreateUser,
@@ -36,7 +35,7 @@ router = APIRouter(prefix="/v1/users", tags=["Users"], route_class=APIRoute)
     description="Route for creating user",
 )
 async def req_create_user(
-    db: Annotated[Session, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
     user_req: Annotated[
         UserToCreate,
         Body(..., openapi_examples=get_user_create_examples()),
@@ -53,18 +52,16 @@ async def req_create_user(
     description="Route for updating user",
 )
 async def req_update_user(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
     user: Annotated[
         UserToUpdate,
         Body(..., openapi_examples=get_user_update_examples()),
     ],
 ) -> ResponseUpdateUser:
     return await update_user(
-        settings=settings,
         db=db,
-        token=token,
+        user_id=user_id,
         user=user,
     )
 
@@ -77,12 +74,10 @@ async def req_update_user(
     description="Route for removing user",
 )
 async def req_user_remove(
-    settings: Annotated[Settings, Depends(get_settings)],
-    db: Annotated[Session, Depends(get_db_session)],
-    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+    user_id: Annotated[uuid.UUID, Depends(current_user)],
 ) -> ResponseRemoveUser:
     return await remove_user(
-        settings=settings,
         db=db,
-        token=token,
+        user_id=user_id,
     )
@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+
+@lru_cache()
+def get_scheduler() -> "AsyncIOScheduler":
+    # Imported on first use, nothing needs apscheduler before the lifespan starts.
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    # Started and shut down by the application lifespan, jobs run on its event loop.
+    return AsyncIOScheduler(
+        timezone="UTC",
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 30},
+    )
@@ -61,6 +61,12 @@ def get_filter_items_examples() -> dict:
                 "price": [500, 1500],
             },
         },
+        "valid_page": {
+            "value": {
+                "category": "Electronics",
+                "limit": 5,
+            },
+        },
     }
 
 
@@ -0,0 +1,38 @@
+from collections.abc import Iterable, Mapping
+
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+
+
+class ModelResponse(Response):
+    # Serializes an already validated response model straight to JSON bytes with
+    # pydantic's compiled serializer. Returning a Response from a route also skips
+    # FastAPI's response_model validation, which would validate the model again.
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: BaseModel,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        exclude_none: bool = False,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        self.exclude_none = exclude_none
+        super().__init__(content, status_code=status_code, headers=headers, background=background)
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content, exclude_none=self.exclude_none)
+
+
+class NDJSONResponse(StreamingResponse):
+    # The body iterator yields batches of newline-delimited JSON, see to_ndjson().
+    media_type = "application/x-ndjson"
+
+
+def to_ndjson(models: Iterable[BaseModel], exclude_none: bool = False) -> bytes:
+    return b"".join(
+        model.__pydantic_serializer__.to_json(model, exclude_none=exclude_none) + b"\n"
+        for model in models
+    )
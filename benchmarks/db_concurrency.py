@@ -0,0 +1,84 @@
+"""Concurrent-request throughput of the blocking vs. the async database layer.
+
+Every simulated request is an ``async def`` handler that runs one query taking
+``--query-ms`` on the server, exactly like the service coroutines do. The
+"sync" variant calls a psycopg2 ``Session`` from inside the coroutine (the old
+data layer), the "async" variant awaits an asyncpg ``AsyncSession``.
+
+Usage (needs the Postgres configured in ``.env``):
+
+    uv run python -m benchmarks.db_concurrency --requests 400 --concurrency 50
+"""
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+import time
+
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session, text
+
+from app.configs.utils import get_settings
+from app.database.utils import async_session_factory, get_engine
+
+QUERY = text("SELECT pg_sleep(:seconds)")
+
+
+def get_sync_engine() -> Engine:
+    settings = get_settings()
+    return create_engine(
+        f"postgresql://{settings.db_user}:{settings.db_password}"
+        f"@{settings.db_host}:{settings.db_port}/{settings.db_name}",
+        poolclass=QueuePool,
+        pool_size=20,
+        max_overflow=30,
+    )
+
+
+async def run(handler: Callable[[], Awaitable[None]], requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request() -> None:
+        async with semaphore:
+            await handler()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int, query_ms: float) -> None:
+    params = {"seconds": query_ms / 1000}
+    sync_engine = get_sync_engine()
+
+    async def handler_sync() -> None:
+        with Session(sync_engine) as db:
+            db.exec(QUERY, params=params).first()
+
+    async def handler_async() -> None:
+        async with async_session_factory() as db:
+            (await db.exec(QUERY, params=params)).first()
+
+    # Warm up both pools so connection setup is not measured.
+    await run(handler_sync, concurrency, concurrency)
+    await run(handler_async, concurrency, concurrency)
+
+    rps_sync = await run(handler_sync, requests, concurrency)
+    rps_async = await run(handler_async, requests, concurrency)
+
+    print(f"requests={requests} concurrency={concurrency} query_ms={query_ms}")
+    print(f"sync Session  : {rps_sync:10.1f} req/s")
+    print(f"AsyncSession  : {rps_async:10.1f} req/s  ({rps_async / rps_sync:.1f}x)")
+
+    sync_engine.dispose()
+    await get_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.query_ms))
@@ -0,0 +1,755 @@
+"""Synthetic catalog, users, discounts and order history at production scale.
+
+Rows are generated in Python from a seeded RNG and streamed into Postgres with
+binary ``COPY`` in batches, so 10M items take minutes rather than the hours of
+row-by-row INSERTs. Secondary indexes of the loaded tables are dropped for the
+load and rebuilt afterwards, and a superuser also skips the foreign key checks. Orders pick items and users from skewed
+(power-law) popularity distributions, and order sizes follow a long tail.
+Older orders go through the packing, shipping and delivery actions. Those that
+also got a "REQUEST FINALIZED" action are then moved into
+``transactions_finalized`` by the app's own finalizer.
+
+Existing rows in the generated tables are deleted first, so ``--truncate`` is
+required on a non-empty database. Every user can sign in with the password
+``password``.
+
+Usage (needs the Postgres configured in ``.env`` with the schema from
+``postgres/CREATE_TABLES.sql``):
+
+    uv run python -m benchmarks.generate_data --items 1000000 --users 100000 --orders 2000000
+"""
+
+import argparse
+from array import array
+import asyncio
+from collections.abc import Callable
+import datetime as dt
+from decimal import Decimal
+import hashlib
+import math
+import random
+import time
+from typing import NamedTuple
+import uuid
+
+import asyncpg
+import orjson
+
+from app.auth.utils import get_password_hash
+from app.configs.utils import get_settings
+from app.database.utils import async_session_factory, get_engine
+from app.discounts.utils import DiscountMatcher
+from app.routers.transactions.utils import (
+    FINALIZED_ACTION,
+    apply_db_discounts,
+    finalize_transactions_batch,
+)
+
+TABLES = {
+    "ground_staff": ("staff_id", "name", "role"),
+    "delivery_options": ("option_id", "name", "contractor_id", "price"),
+    "users": ("user_id", "email", "phone", "password_hash", "created_at", "updated_at"),
+    "items": (
+        "item_id",
+        "name",
+        "category",
+        "subcategories",
+        "price",
+        "brand",
+        "description",
+        "features",
+        "created_at",
+        "updated_at",
+        "stock",
+    ),
+    "items_snapshots": (
+        "item_id",
+        "name",
+        "category",
+        "subcategories",
+        "price",
+        "brand",
+        "description",
+        "features",
+        "created_at",
+        "updated_at",
+    ),
+    "discounts": (
+        "discount_code",
+        "description",
+        "valid_from",
+        "valid_to",
+        "discount_percentage",
+        "item_ids",
+        "brands",
+        "categories",
+    ),
+    "transactions": (
+        "transaction_id",
+        "user_id",
+        "created_at",
+        "delivery_option_id",
+        "total_price",
+        "name",
+        "last_name",
+        "email",
+        "phone",
+        "country",
+        "city",
+        "postal_code",
+        "address_line_1",
+        "address_line_2",
+    ),
+    "transaction_items": (
+        "transaction_id",
+        "item_id",
+        "updated_at",
+        "count",
+        "price_after_discounts",
+    ),
+    "transaction_discounts": ("transaction_id", "discount_code"),
+    "transaction_actions": (
+        "action_id",
+        "transaction_id",
+        "action",
+        "description",
+        "performed_by",
+        "performed_at",
+    ),
+}
+# Also emptied, since they reference the generated rows.
+DEPENDENT_TABLES = ("transactions_finalized", "idempotency_keys")
+
+
+class Category(NamedTuple):
+    # (subcategory, noun used in item names)
+    subcategories: tuple[tuple[str, str], ...]
+    brands: tuple[str, ...]
+    median_price: float
+    features: dict[str, tuple[object, ...]]
+
+
+CATALOG = {
+    "Electronics": Category(
+        (
+            ("Smartphones", "Smartphone"),
+            ("Laptops", "Laptop"),
+            ("Tablets", "Tablet"),
+            ("Headphones", "Headphones"),
+            ("Cameras", "Camera"),
+            ("Televisions", "TV"),
+            ("Smartwatches", "Smartwatch"),
+            ("Gaming Consoles", "Console"),
+        ),
+        ("APPLE", "SAMSUNG", "SONY", "LG", "BOSE", "CANON", "NINTENDO", "DELL", "LENOVO"),
+        450.0,
+        {
+            "color": ("Black", "Silver", "Space Gray", "White", "Blue"),
+            "storage": ("64GB", "128GB", "256GB", "512GB", "1TB"),
+            "warranty": ("1 Year", "2 Years", "3 Years"),
+            "condition": ("New", "Refurbished"),
+            "wireless": (True, False),
+            "battery_life": ("8 hours", "12 hours", "20 hours", "30 hours"),
+        },
+    ),
+    "Fashion": Category(
+        (
+            ("Shoes", "Sneakers"),
+            ("Jackets", "Jacket"),
+            ("Jeans", "Jeans"),
+            ("T-Shirts", "T-Shirt"),
+            ("Sunglasses", "Sunglasses"),
+            ("Watches", "Watch"),
+            ("Bags", "Backpack"),
+        ),
+        ("NIKE", "ADIDAS", "LEVI'S", "PATAGONIA", "RAY-BAN", "ROLEX", "ZARA", "PUMA"),
+        80.0,
+        {
+            "size": ("XS", "S", "M", "L", "XL", "XXL"),
+            "color": ("Black", "White", "Navy", "Olive", "Red", "Beige"),
+            "material": ("Cotton", "Leather", "Polyester", "Denim", "Wool"),
+            "gender": ("Men", "Women", "Unisex"),
+        },
+    ),
+    "Home": Category(
+        (
+            ("Kitchen Appliances", "Mixer"),
+            ("Vacuum Cleaners", "Vacuum"),
+            ("Cookware", "Pan Set"),
+            ("Bedding", "Duvet"),
+            ("Lighting", "Lamp"),
+            ("Drinkware", "Tumbler"),
+        ),
+        ("KITCHENAID", "DYSON", "PHILIPS", "IKEA", "YETI", "TEFAL", "BOSCH"),
+        120.0,
+        {
+            "color": ("White", "Black", "Red", "Stainless Steel", "Copper"),
+            "capacity": ("0.5L", "1L", "1.5L", "5L"),
+            "power": ("300W", "800W", "1200W", "2000W"),
+            "dishwasher_safe": (True, False),
+        },
+    ),
+    "Furniture": Category(
+        (
+            ("Office Chairs", "Office Chair"),
+            ("Desks", "Desk"),
+            ("Sofas", "Sofa"),
+            ("Shelves", "Bookshelf"),
+            ("Beds", "Bed Frame"),
+        ),
+        ("HERMAN MILLER", "IKEA", "STEELCASE", "WEST ELM", "HAY"),
+        350.0,
+        {
+            "material": ("Oak", "Walnut", "Steel", "Fabric", "Leather"),
+            "color": ("Natural", "Black", "Grey", "White"),
+            "assembly_required": (True, False),
+            "warranty": ("2 Years", "5 Years", "12 Years"),
+        },
+    ),
+    "Sports": Category(
+        (
+            ("Bikes", "Bike"),
+            ("Running", "Running Shoes"),
+            ("Fitness", "Dumbbell Set"),
+            ("Camping", "Tent"),
+            ("Swimming", "Goggles"),
+        ),
+        ("TREK", "NIKE", "ADIDAS", "GARMIN", "DECATHLON", "SPECIALIZED", "COLUMBIA"),
+        90.0,
+        {
+            "size": ("S", "M", "L", "XL"),
+            "color": ("Black", "Red", "Blue", "Green"),
+            "weight": ("0.3kg", "1kg", "5kg", "12kg"),
+            "waterproof": (True, False),
+        },
+    ),
+    "Music": Category(
+        (
+            ("Guitars", "Guitar"),
+            ("Keyboards", "Keyboard"),
+            ("Drums", "Drum Kit"),
+            ("Studio Equipment", "Audio Interface"),
+        ),
+        ("FENDER", "GIBSON", "YAMAHA", "ROLAND", "FOCUSRITE", "KORG"),
+        400.0,
+        {
+            "color": ("Sunburst", "Black", "Natural", "White"),
+            "strings": (4, 6, 7, 12),
+            "connectivity": ("USB", "MIDI", "Bluetooth"),
+            "case_included": (True, False),
+        },
+    ),
+    "Books": Category(
+        (
+            ("Fiction", "Novel"),
+            ("Programming", "Guide"),
+            ("Cooking", "Cookbook"),
+            ("History", "Chronicle"),
+            ("Children", "Picture Book"),
+        ),
+        ("PENGUIN", "O'REILLY", "HARPERCOLLINS", "PENGUIN RANDOM HOUSE", "MANNING"),
+        25.0,
+        {
+            "format": ("Hardcover", "Paperback", "eBook"),
+            "language": ("English", "Polish", "German", "Spanish"),
+            "pages": (120, 240, 380, 560, 920),
+        },
+    ),
+    "Toys": Category(
+        (
+            ("Building Sets", "Building Set"),
+            ("Board Games", "Board Game"),
+            ("Dolls", "Doll"),
+            ("Puzzles", "Puzzle"),
+        ),
+        ("LEGO", "HASBRO", "MATTEL", "RAVENSBURGER", "PLAYMOBIL"),
+        40.0,
+        {
+            "age": ("3+", "6+", "8+", "12+", "18+"),
+            "pieces": (100, 500, 1000, 3000),
+            "batteries_required": (True, False),
+        },
+    ),
+}
+CATEGORIES = tuple(CATALOG)
+ADJECTIVES = (
+    "Pro",
+    "Max",
+    "Ultra",
+    "Classic",
+    "Premium",
+    "Compact",
+    "Lite",
+    "Essential",
+    "Signature",
+    "Sport",
+    "Deluxe",
+    "Smart",
+)
+SENTENCES = (
+    "Built to last with premium materials and careful attention to detail.",
+    "A customer favourite that combines everyday comfort with reliable performance.",
+    "Designed for professionals and enthusiasts who expect the best.",
+    "Lightweight and portable, perfect for travel and daily use.",
+    "Backed by an extended warranty and free returns.",
+    "An updated model with improved efficiency and a refined design.",
+    "Great value for money without compromising on quality.",
+    "Easy to set up and simple to maintain.",
+)
+# Distinct items per order and units per order line.
+ORDER_LINES_WEIGHTS = (45, 25, 12, 7, 4, 3, 2, 1, 1)
+LINE_COUNT_WEIGHTS = (80, 14, 4, 2)
+DISCOUNT_PERCENTAGES = (5, 10, 15, 20, 25, 30, 40, 50)
+DELIVERY_OPTIONS = (
+    ("COURIER STANDARD DELIVERY", Decimal("15.00")),
+    ("COURIER EXPRESS DELIVERY", Decimal("29.00")),
+    ("PARCEL LOCKER", Decimal("9.99")),
+    ("PICKUP POINT", Decimal("7.99")),
+)
+STAFF_ROLES = ("DELIVERY", "MAGAZINE", "IT_OPS")
+# (action, staff role, minimum and maximum hours after the previous action)
+ACTION_FLOW = (
+    ("ITEM(S) PACKED", "MAGAZINE", 1, 24),
+    ("PACKAGE SHIPPED", "DELIVERY", 2, 48),
+    ("PACKAGE DELIVERED", "DELIVERY", 12, 96),
+    (FINALIZED_ACTION, "IT_OPS", 24, 24 * 14),
+)
+FIRST_NAMES = ("John", "Anna", "Piotr", "Maria", "Tomasz", "Julia", "Adam", "Ewa", "Marek", "Ola")
+LAST_NAMES = (
+    "Doe",
+    "Nowak",
+    "Kowalski",
+    "Smith",
+    "Wisniewska",
+    "Lewandowski",
+    "Brown",
+    "Zielinska",
+)
+CITIES = (
+    ("Poland", "Warsaw", "00-001"),
+    ("Poland", "Krakow", "31-001"),
+    ("Poland", "Gdansk", "80-001"),
+    ("Germany", "Berlin", "10115"),
+    ("Germany", "Munich", "80331"),
+    ("Czechia", "Prague", "110 00"),
+)
+STREETS = ("Main Street", "Market Square", "Park Avenue", "Station Road", "River Lane")
+
+
+def get_id(kind: str, index: int) -> uuid.UUID:
+    # Same ids as md5(kind || index)::uuid in SQL, so runs are reproducible.
+    return uuid.UUID(bytes=hashlib.md5(f"{kind}{index}".encode()).digest())
+
+
+def pick_skewed(rng: random.Random, size: int, skew: float) -> int:
+    # Power-law popularity: low indexes are picked far more often than high ones.
+    return min(int(size * rng.random() ** skew), size - 1)
+
+
+def to_decimal(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+class Catalog:
+    # Compact per-item attributes kept for order generation, a few bytes per item.
+
+    def __init__(self, size: int, rng: random.Random, now: dt.datetime) -> None:
+        self.size = size
+        self.rng = rng
+        self.now = now
+        self.category = array("B")
+        self.subcategories = array("H")
+        self.brand = array("B")
+        self.price_cents = array("L")
+        self.updated_at = array("L")
+
+    def get_item(self, index: int) -> "CatalogItem":
+        category = CATALOG[CATEGORIES[self.category[index]]]
+        first, second = divmod(self.subcategories[index], 256)
+        subcategories = [category.subcategories[first][0]]
+        if second != first:
+            subcategories.append(category.subcategories[second][0])
+        return CatalogItem(
+            item_id=get_id("item", index),
+            category=CATEGORIES[self.category[index]],
+            subcategories=subcategories,
+            brand=category.brands[self.brand[index]],
+            price=to_decimal(self.price_cents[index]),
+            updated_at=dt.datetime.fromtimestamp(self.updated_at[index], dt.UTC),
+        )
+
+    def generate(self, start: int, stop: int) -> dict[str, list[tuple]]:
+        rng = self.rng
+        items, snapshots = [], []
+        for index in range(start, stop):
+            category_index = pick_skewed(rng, len(CATEGORIES), 1.5)
+            category_name = CATEGORIES[category_index]
+            category = CATALOG[category_name]
+            first = rng.randrange(len(category.subcategories))
+            second = rng.randrange(len(category.subcategories)) if rng.random() < 0.4 else first
+            subcategories = [category.subcategories[first][0]]
+            if second != first:
+                subcategories.append(category.subcategories[second][0])
+            noun = category.subcategories[first][1]
+            brand_index = pick_skewed(rng, len(category.brands), 2.0)
+            brand = category.brands[brand_index]
+            adjective = rng.choice(ADJECTIVES)
+            model = f"{rng.choice('ASXZMG')}{rng.randrange(1, 1000)}"
+            price_cents = max(int(rng.lognormvariate(math.log(category.median_price), 0.7)), 1)
+            price_cents = price_cents * 100 + 99
+            features = {
+                name: rng.choice(values)
+                for name, values in rng.sample(
+                    list(category.features.items()), rng.randint(2, len(category.features))
+                )
+            }
+            created_at = self.now - dt.timedelta(days=730 * rng.random() + 365)
+            # Whole seconds, so the compact copy in self.updated_at is exact.
+            updated_at = (created_at + dt.timedelta(days=365 * rng.random())).replace(microsecond=0)
+            snapshot = (
+                get_id("item", index),
+                f"{brand.title()} {adjective} {noun} {model}",
+                category_name,
+                subcategories,
+                to_decimal(price_cents),
+                brand,
+                f"{adjective} {noun.lower()} by {brand.title()}. {rng.choice(SENTENCES)} "
+                f"{rng.choice(SENTENCES)}",
+                orjson.dumps(features).decode(),
+                created_at,
+                updated_at,
+            )
+            snapshots.append(snapshot)
+            stock = 0 if rng.random() < 0.05 else rng.randint(1, 500)
+            items.append((*snapshot, stock))
+
+            self.category.append(category_index)
+            self.subcategories.append(first * 256 + second)
+            self.brand.append(brand_index)
+            self.price_cents.append(price_cents)
+            self.updated_at.append(int(updated_at.timestamp()))
+        return {"items": items, "items_snapshots": snapshots}
+
+
+class CatalogItem(NamedTuple):
+    # Has the attributes DiscountMatcher.matches reads from DBItem.
+    item_id: uuid.UUID
+    category: str
+    subcategories: list[str]
+    brand: str
+    price: Decimal
+    updated_at: dt.datetime
+
+
+def generate_staff(count: int) -> dict[str, list[tuple]]:
+    staff = [
+        (get_id("staff", index), f"{STAFF_ROLES[index % 3]}_WORKER{index}", STAFF_ROLES[index % 3])
+        for index in range(max(count, len(STAFF_ROLES)))
+    ]
+    couriers = [row[0] for row in staff if row[2] == "DELIVERY"]
+    delivery_options = [
+        (get_id("delivery", index), name, couriers[index % len(couriers)], price)
+        for index, (name, price) in enumerate(DELIVERY_OPTIONS)
+    ]
+    return {"ground_staff": staff, "delivery_options": delivery_options}
+
+
+def generate_users(start: int, stop: int, password_hash: str, now: dt.datetime) -> list[tuple]:
+    users = []
+    for index in range(start, stop):
+        created_at = now - dt.timedelta(seconds=index % (3 * 365 * 24 * 3600))
+        users.append(
+            (
+                get_id("user", index),
+                f"user{index}@example.com",
+                f"+48{index:09}",
+                password_hash,
+                created_at,
+                created_at,
+            )
+        )
+    return users
+
+
+def generate_discounts(
+    count: int, catalog: Catalog, rng: random.Random, now: dt.datetime
+) -> tuple[list[tuple], list[DiscountMatcher]]:
+    discounts, matchers = [], []
+    for index in range(count):
+        category_name = rng.choice(CATEGORIES)
+        category = CATALOG[category_name]
+        percentage = Decimal(rng.choice(DISCOUNT_PERCENTAGES))
+        item_ids = brands = categories = None
+        kind = rng.random()
+        if kind < 0.4:
+            brands = [rng.choice(category.brands)]
+            description = f"{percentage}% off on all {brands[0].title()} products"
+        elif kind < 0.8:
+            subcategory = rng.choice(category.subcategories)[0]
+            categories = {category_name: [subcategory]}
+            description = f"{percentage}% off on {subcategory.lower()}"
+        else:
+            item_ids = [
+                get_id("item", pick_skewed(rng, catalog.size, 2.5))
+                for _ in range(rng.randint(1, 20))
+            ]
+            description = f"{percentage}% off on selected items"
+        # Most codes are running now, the rest have expired or not started yet.
+        valid_from = now - dt.timedelta(days=rng.uniform(-30, 365))
+        valid_to = valid_from + dt.timedelta(days=rng.uniform(7, 400))
+        discount = (
+            f"SALE_{index}",
+            description,
+            valid_from,
+            valid_to,
+            percentage,
+            item_ids,
+            brands,
+            orjson.dumps(categories).decode() if categories else None,
+        )
+        discounts.append(discount)
+        matchers.append(
+            DiscountMatcher(
+                discount_code=discount[0],
+                discount_percentage=percentage,
+                multiplier=1 - percentage / 100,
+                valid_from=valid_from,
+                valid_to=valid_to,
+                item_ids=frozenset(item_ids) if item_ids else None,
+                brands=frozenset(brands) if brands else None,
+                categories={name: frozenset(subs) for name, subs in categories.items()}
+                if categories
+                else None,
+            )
+        )
+    return discounts, matchers
+
+
+def generate_orders(
+    start: int,
+    stop: int,
+    args: argparse.Namespace,
+    catalog: Catalog,
+    discounts: list[DiscountMatcher],
+    staff: list[tuple],
+    delivery_options: list[tuple],
+    rng: random.Random,
+    now: dt.datetime,
+) -> dict[str, list[tuple]]:
+    staff_by_role = {role: [row[0] for row in staff if row[2] == role] for role in STAFF_ROLES}
+    order_lines = range(1, len(ORDER_LINES_WEIGHTS) + 1)
+    line_counts = range(1, len(LINE_COUNT_WEIGHTS) + 1)
+    rows = {
+        "transactions": [],
+        "transaction_items": [],
+        "transaction_discounts": [],
+        "transaction_actions": [],
+    }
+    for index in range(start, stop):
+        transaction_id = get_id("transaction", index)
+        user_index = pick_skewed(rng, args.users, 2.0)
+        created_at = now - dt.timedelta(days=args.days * rng.random() ** 0.7)
+        order_discounts = (
+            rng.sample(discounts, min(rng.randint(1, 2), len(discounts)))
+            if discounts and rng.random() < 0.15
+            else []
+        )
+        delivery_option = rng.choice(delivery_options)
+
+        (lines,) = rng.choices(order_lines, ORDER_LINES_WEIGHTS)
+        item_indexes = {pick_skewed(rng, catalog.size, 2.5) for _ in range(lines)}
+        total_price = delivery_option[3]
+        for item_index in item_indexes:
+            item = catalog.get_item(item_index)
+            (count,) = rng.choices(line_counts, LINE_COUNT_WEIGHTS)
+            price_after_discounts, _ = apply_db_discounts(item, item.price, order_discounts)
+            total_price += price_after_discounts * count
+            rows["transaction_items"].append(
+                (transaction_id, item.item_id, item.updated_at, count, price_after_discounts)
+            )
+        for discount in order_discounts:
+            rows["transaction_discounts"].append((transaction_id, discount.discount_code))
+
+        country, city, postal_code = rng.choice(CITIES)
+        rows["transactions"].append(
+            (
+                transaction_id,
+                get_id("user", user_index),
+                created_at,
+                delivery_option[0],
+                total_price.quantize(Decimal("0.01")),
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                f"user{user_index}@example.com",
+                f"+48{user_index:09}",
+                country,
+                city,
+                postal_code,
+                f"{rng.choice(STREETS)} {rng.randint(1, 200)}",
+                f"Apt {rng.randint(1, 80)}" if rng.random() < 0.3 else None,
+            )
+        )
+
+        # Orders advance through the flow until an action would lie in the future.
+        performed_at = created_at
+        for step, (action, role, min_hours, max_hours) in enumerate(ACTION_FLOW):
+            performed_at += dt.timedelta(hours=rng.uniform(min_hours, max_hours))
+            if performed_at > now:
+                break
+            if action == FINALIZED_ACTION and rng.random() >= args.finalized_ratio:
+                break
+            rows["transaction_actions"].append(
+                (
+                    get_id(f"action{step}-", index),
+                    transaction_id,
+                    action,
+                    None,
+                    rng.choice(staff_by_role[role]),
+                    performed_at,
+                )
+            )
+    return rows
+
+
+async def copy_rows(conn: asyncpg.Connection, rows: dict[str, list[tuple]]) -> None:
+    for table, records in rows.items():
+        if records:
+            await conn.copy_records_to_table(table, records=records, columns=TABLES[table])
+
+
+async def copy_batches(
+    conn: asyncpg.Connection,
+    generate_batch: Callable[[int, int], dict[str, list[tuple]]],
+    size: int,
+    batch_size: int,
+) -> None:
+    # The next batch is generated in a thread while the current one is copied.
+    copying = None
+    for start in range(0, size, batch_size):
+        rows = await asyncio.to_thread(generate_batch, start, min(start + batch_size, size))
+        if copying is not None:
+            await copying
+        copying = asyncio.create_task(copy_rows(conn, rows))
+    if copying is not None:
+        await copying
+
+
+async def get_secondary_indexes(conn: asyncpg.Connection) -> list[asyncpg.Record]:
+    # Indexes that do not back a primary key or unique constraint.
+    return await conn.fetch(
+        """
+        SELECT i.indexname, i.indexdef FROM pg_indexes i
+        WHERE i.schemaname = current_schema() AND i.tablename = ANY($1::text[])
+            AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+        """,
+        list(TABLES),
+    )
+
+
+async def generate(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    rng = random.Random(args.seed)
+    now = dt.datetime.now(dt.UTC)
+    conn = await asyncpg.connect(
+        host=settings.db_host,
+        port=settings.db_port,
+        user=settings.db_user,
+        password=settings.db_password,
+        database=settings.db_name,
+    )
+    try:
+        if not args.truncate and await conn.fetchval("SELECT EXISTS (SELECT FROM items)"):
+            raise SystemExit("The database is not empty, pass --truncate to replace its data")
+        await conn.execute(f"TRUNCATE {', '.join([*TABLES, *DEPENDENT_TABLES])} CASCADE")
+        # The rows are consistent by construction, so a superuser skips the per-row
+        # foreign key triggers for this session.
+        if await conn.fetchval("SELECT rolsuper FROM pg_roles WHERE rolname = current_user"):
+            await conn.execute("SET session_replication_role = replica")
+        indexes = await get_secondary_indexes(conn)
+        for index in indexes:
+            await conn.execute(f'DROP INDEX "{index["indexname"]}"')
+
+        started_at = time.perf_counter()
+
+        def report(name: str, count: int) -> None:
+            print(
+                f"{name:24} {count:>12,} rows  {time.perf_counter() - started_at:8.1f} s",
+                flush=True,
+            )
+
+        try:
+            staff_rows = generate_staff(args.staff)
+            await copy_rows(conn, staff_rows)
+            report("ground_staff", len(staff_rows["ground_staff"]))
+
+            password_hash = get_password_hash("password", settings.auth_bcrypt_rounds)
+            await copy_batches(
+                conn,
+                lambda start, stop: {"users": generate_users(start, stop, password_hash, now)},
+                args.users,
+                args.batch_size,
+            )
+            report("users", args.users)
+
+            catalog = Catalog(args.items, rng, now)
+            await copy_batches(conn, catalog.generate, args.items, args.batch_size)
+            report("items", args.items)
+
+            discounts, matchers = generate_discounts(args.discounts, catalog, rng, now)
+            await copy_rows(conn, {"discounts": discounts})
+            report("discounts", args.discounts)
+
+            await copy_batches(
+                conn,
+                lambda start, stop: generate_orders(
+                    start,
+                    stop,
+                    args,
+                    catalog,
+                    matchers,
+                    staff_rows["ground_staff"],
+                    staff_rows["delivery_options"],
+                    rng,
+                    now,
+                ),
+                args.orders,
+                args.batch_size,
+            )
+            report("transactions", args.orders)
+        finally:
+            # Rebuilt even when the load fails, so the schema never loses them.
+            for index in indexes:
+                await conn.execute(index["indexdef"])
+        await conn.execute("ANALYZE")
+        report("indexes", len(indexes))
+    finally:
+        await conn.close()
+
+    if not args.skip_finalize:
+        finalized = 0
+        async with async_session_factory() as db:
+            while count := await finalize_transactions_batch(db, args.batch_size):
+                finalized += count
+        await get_engine().dispose()
+        report("transactions_finalized", finalized)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--discounts", type=int, default=200)
+    parser.add_argument("--staff", type=int, default=30)
+    parser.add_argument("--days", type=float, default=365.0, help="Span of the order history.")
+    parser.add_argument(
+        "--finalized-ratio",
+        type=float,
+        default=0.9,
+        help="Share of delivered orders that get a REQUEST FINALIZED action.",
+    )
+    parser.add_argument("--skip-finalize", action="store_true", help="Leave them unfinalized.")
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truncate", action="store_true")
+    asyncio.run(generate(parser.parse_args()))
@@ -0,0 +1,418 @@
+"""End-to-end load test of the public routes, with a regression check against a baseline.
+
+``run`` starts the API under uvicorn against the Postgres configured in ``.env``
+(or targets ``--base-url``), signs up two benchmark users and then keeps
+``--concurrency`` async HTTP clients busy for ``--duration`` seconds. Each
+request picks a scenario by the weights in ``--mix``. Order routes read a user
+with a fixed set of orders, checkouts are placed by the other one, so reads cost
+the same however long the run and however many orders it places. Latency percentiles and
+requests per second are reported per route and written as JSON.
+
+``compare`` reads two such files and exits non-zero when a route's p95 latency
+grew or its throughput dropped by more than ``--tolerance``, when its error rate
+rose by more than ``--tolerance`` of all its requests, or when it is missing
+from the current run. Latency and throughput of routes with fewer than
+``--min-requests`` requests in either run are not compared.
+
+Usage:
+
+    uv run python -m benchmarks.load run --duration 30 --concurrency 50 --output load.json
+    uv run python -m benchmarks.load run --mix items_query=10,transactions_create=1
+    uv run python -m benchmarks.load compare benchmarks/baseline.json load.json
+"""
+
+import argparse
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+import contextlib
+from dataclasses import dataclass, field
+import datetime as dt
+import json
+import math
+import os
+from pathlib import Path
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+from sqlmodel import select
+
+DEFAULT_MIX = (
+    "home=1,healthcheck=1,livez=1,readyz=1,items_query=20,items_search=5,item=20,items_export=1,"
+    "auth_token=2,transactions_create=5,transactions_current=5,transaction_current=5,"
+    "transactions_finalized=3,transactions_finalized_export=1"
+)
+PASSWORD = "benchmark-password"
+READER_ORDERS = 10
+
+
+@dataclass
+class User:
+    email: str
+    phone: str
+    headers: dict[str, str]
+
+
+@dataclass
+class Context:
+    # `reader` owns the orders the transaction scenarios read, `buyer` places new ones.
+    reader: User
+    buyer: User
+    item_ids: list[str]
+    delivery_option_id: str
+    transaction_ids: list[str] = field(default_factory=list)
+
+
+Scenario = Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]
+
+
+def get_transaction_body(context: Context, user: User) -> dict:
+    return {
+        "item_ids": {item_id: 1 for item_id in random.sample(context.item_ids, 2)},
+        "delivery_option_id": context.delivery_option_id,
+        "discount_codes": [],
+        "name": "John",
+        "last_name": "Doe",
+        "email": user.email,
+        "phone": user.phone,
+        "country": "Poland",
+        "city": "Krakow",
+        "postal_code": "31-001",
+        "address_line_1": "Wawel 1",
+    }
+
+
+def place_order(
+    client: httpx.AsyncClient, context: Context, user: User
+) -> Awaitable[httpx.Response]:
+    return client.post(
+        "/v1/transactions/create", json=get_transaction_body(context, user), headers=user.headers
+    )
+
+
+async def get_current_transaction(client: httpx.AsyncClient, context: Context) -> httpx.Response:
+    transaction_id = random.choice(context.transaction_ids)
+    return await client.get(
+        f"/v1/transactions/current/{transaction_id}", headers=context.reader.headers
+    )
+
+
+# Scenario name -> (route label, request).
+SCENARIOS: dict[str, tuple[str, Scenario]] = {
+    "home": ("GET /", lambda client, context: client.get("/")),
+    "healthcheck": ("GET /healthcheck", lambda client, context: client.get("/healthcheck")),
+    "livez": ("GET /livez", lambda client, context: client.get("/livez")),
+    "readyz": ("GET /readyz", lambda client, context: client.get("/readyz")),
+    "items_query": (
+        "GET /v1/items/query",
+        lambda client, context: client.get("/v1/items/query", params={"limit": 20}),
+    ),
+    "items_search": (
+        "GET /v1/items/query?search",
+        lambda client, context: client.get(
+            "/v1/items/query", params={"search": random.choice(["pro", "max", "sony"])}
+        ),
+    ),
+    "item": (
+        "GET /v1/items/item/{item_id}",
+        lambda client, context: client.get(f"/v1/items/item/{random.choice(context.item_ids)}"),
+    ),
+    "items_export": (
+        "GET /v1/items/export",
+        lambda client, context: client.get("/v1/items/export"),
+    ),
+    "auth_token": (
+        "POST /v1/auth/token",
+        lambda client, context: client.post(
+            "/v1/auth/token", data={"username": context.reader.email, "password": PASSWORD}
+        ),
+    ),
+    "transactions_create": (
+        "POST /v1/transactions/create",
+        lambda client, context: place_order(client, context, context.buyer),
+    ),
+    "transactions_current": (
+        "GET /v1/transactions/current",
+        lambda client, context: client.get(
+            "/v1/transactions/current", headers=context.reader.headers
+        ),
+    ),
+    "transaction_current": (
+        "GET /v1/transactions/current/{transaction_id}",
+        get_current_transaction,
+    ),
+    "transactions_finalized": (
+        "GET /v1/transactions/finalized",
+        lambda client, context: client.get(
+            "/v1/transactions/finalized", headers=context.reader.headers
+        ),
+    ),
+    "transactions_finalized_export": (
+        "GET /v1/transactions/finalized/export",
+        lambda client, context: client.get(
+            "/v1/transactions/finalized/export", headers=context.reader.headers
+        ),
+    ),
+}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}, choose from: {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def serve(base_url: str | None, workers: int) -> AsyncIterator[str]:
+    if base_url:
+        yield base_url
+        return
+    port = get_free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+        + ["--workers", str(workers), "--no-access-log", "--log-level", "warning"],
+        env={**os.environ, "LOGGER_LEVEL": "WARNING", "WEB_CONCURRENCY": str(workers)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            for _ in range(100):
+                with contextlib.suppress(httpx.TransportError):
+                    if (await client.get("/readyz")).status_code == 200:
+                        break
+                if server.poll() is not None:
+                    raise SystemExit(f"The API exited with code {server.returncode}")
+                await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("The API did not become healthy")
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def sign_up(client: httpx.AsyncClient) -> User:
+    email = f"benchmark-{uuid.uuid4().hex[:12]}@example.com"
+    phone = f"+48{random.randrange(10**9):09}"
+    response = await client.post(
+        "/v1/users/", json={"email": email, "phone": phone, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    response = await client.post("/v1/auth/token", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return User(
+        email=email,
+        phone=phone,
+        headers={"Authorization": f"Bearer {response.json()['access_token']}"},
+    )
+
+
+async def get_context(client: httpx.AsyncClient) -> Context:
+    # Imported here so that ``compare`` runs without the database settings.
+    from app.database.dbmodels import DBDeliveryOptions, DBItem
+    from app.database.utils import async_session_factory, get_engine
+
+    # Items with the most stock, so checkouts keep succeeding during the run.
+    async with async_session_factory() as db:
+        item_ids = (
+            await db.exec(
+                select(DBItem.item_id)
+                .where(DBItem.stock > 0)
+                .order_by(DBItem.stock.desc())
+                .limit(50)
+            )
+        ).all()
+        delivery_option_id = (await db.exec(select(DBDeliveryOptions.option_id))).first()
+    await get_engine().dispose()
+    if len(item_ids) < 2 or delivery_option_id is None:
+        raise SystemExit("The database needs at least two items in stock and a delivery option")
+
+    context = Context(
+        reader=await sign_up(client),
+        buyer=await sign_up(client),
+        item_ids=[str(item_id) for item_id in item_ids],
+        delivery_option_id=str(delivery_option_id),
+    )
+    # Transaction scenarios read these orders, no scenario adds to them.
+    for _ in range(READER_ORDERS):
+        response = await place_order(client, context, context.reader)
+        response.raise_for_status()
+        context.transaction_ids.append(response.json()["transaction"]["transaction_id"])
+    return context
+
+
+def percentile(latencies: list[float], percent: float) -> float:
+    # Nearest-rank percentile of sorted latencies.
+    return latencies[max(math.ceil(percent / 100 * len(latencies)) - 1, 0)]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    context: Context,
+    weights: dict[str, float],
+    duration: float,
+    concurrency: int,
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    latencies: dict[str, list[float]] = {name: [] for name in weights}
+    errors = dict.fromkeys(weights, 0)
+    names, name_weights = list(weights), list(weights.values())
+
+    async def worker(deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            (name,) = random.choices(names, name_weights)
+            started_at = time.perf_counter()
+            try:
+                response = await SCENARIOS[name][1](client, context)
+                # Read streamed bodies to the end so exports are timed in full.
+                await response.aread()
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[name].append(time.perf_counter() - started_at)
+            errors[name] += failed
+
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+    await asyncio.gather(*(worker(deadline) for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started_at
+
+
+async def run(args: argparse.Namespace) -> None:
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with (
+        serve(args.base_url, args.workers) as base_url,
+        httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client,
+    ):
+        context = await get_context(client)
+        if args.warmup > 0:
+            await drive(client, context, weights, args.warmup, args.concurrency)
+        latencies, errors, elapsed = await drive(
+            client, context, weights, args.duration, args.concurrency
+        )
+
+    routes = {
+        SCENARIOS[name][0]: summarize(latencies[name], errors[name], elapsed)
+        for name in weights
+        if latencies[name]
+    }
+    results = {
+        "created_at": dt.datetime.now(dt.UTC).isoformat(),
+        "config": {
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "mix": weights,
+        },
+        "total": summarize(
+            [latency for values in latencies.values() for latency in values],
+            sum(errors.values()),
+            elapsed,
+        ),
+        "routes": routes,
+    }
+
+    print(f"{'route':48} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for route, stats in [*routes.items(), ("total", results["total"])]:
+        print(
+            f"{route:48} {stats['rps']:9.1f} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f}"
+            f" {stats['p99_ms']:9.2f} {stats['errors']:7}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+
+def get_error_rate(stats: dict) -> float:
+    return stats["errors"] / stats["requests"] if stats["requests"] else 0.0
+
+
+def compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["routes"]
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))["routes"]
+    regressions = 0
+    print(f"{'route':48} {'p95 ms':>22} {'req/s':>21} {'errors %':>17}")
+    for route, before in baseline.items():
+        after = current.get(route)
+        if after is None:
+            regressions += 1
+            print(f"{route:48} missing from {args.current}  REGRESSION")
+            continue
+        # Checked regardless of the request count, a route failing fast can look faster.
+        error_rates = get_error_rate(before), get_error_rate(after)
+        failing = error_rates[1] > error_rates[0] + args.tolerance
+        errors = f" {error_rates[0]:7.1%} -> {error_rates[1]:7.1%}"
+        # Percentiles of a handful of requests are noise.
+        if min(before["requests"], after["requests"]) < args.min_requests:
+            regressions += failing
+            print(
+                f"{route:48} {f'fewer than {args.min_requests} requests':44}{errors}"
+                f"{'  REGRESSION' if failing else ''}"
+            )
+            continue
+        slower = after["p95_ms"] > before["p95_ms"] * (1 + args.tolerance)
+        fewer = after["rps"] < before["rps"] * (1 - args.tolerance)
+        regressions += slower or fewer or failing
+        print(
+            f"{route:48} {before['p95_ms']:9.2f} -> {after['p95_ms']:9.2f}"
+            f" {before['rps']:8.1f} -> {after['rps']:8.1f}{errors}"
+            f"{'  REGRESSION' if slower or fewer or failing else ''}"
+        )
+    print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = subparsers.add_parser("run", help="Load the API and report per-route latency.")
+    parser_run.add_argument("--base-url", help="Target a running API instead of starting one.")
+    parser_run.add_argument("--workers", type=int, default=1)
+    parser_run.add_argument("--duration", type=float, default=30.0)
+    parser_run.add_argument("--warmup", type=float, default=5.0)
+    parser_run.add_argument("--concurrency", type=int, default=50)
+    parser_run.add_argument("--mix", default=DEFAULT_MIX)
+    parser_run.add_argument("--output", help="JSON file for the results.")
+
+    parser_compare = subparsers.add_parser("compare", help="Flag regressions against a baseline.")
+    parser_compare.add_argument("baseline")
+    parser_compare.add_argument("current")
+    parser_compare.add_argument("--tolerance", type=float, default=0.1)
+    parser_compare.add_argument("--min-requests", type=int, default=30)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run(args))
+    else:
+        sys.exit(compare(args))
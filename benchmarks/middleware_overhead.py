@@ -0,0 +1,132 @@
+"""Per-request overhead of the ASGI CustomMiddleware vs. the BaseHTTPMiddleware one.
+
+Both middlewares wrap the same minimal Starlette app and are driven directly
+through the ASGI interface, so the numbers contain no network or server cost.
+Application logging is silenced unless ``--with-logging`` is passed, which
+isolates the middleware machinery from log formatting and I/O.
+
+Usage:
+
+    uv run python -m benchmarks.middleware_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import datetime as dt
+import logging
+import time
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message
+
+from app.logger.utils import get_logger, log_error, start_log_listener, stop_log_listener
+from app.middleware.middleware import CustomMiddleware
+
+logger = get_logger()
+
+
+class BaseHTTPCustomMiddleware(BaseHTTPMiddleware):
+    # The previous CustomMiddleware implementation, kept as the baseline.
+    async def dispatch(self, request: Request, call_next: Callable) -> JSONResponse:
+        req_id = uuid4()
+        log = {
+            "timestamp": dt.datetime.now(dt.UTC).isoformat(),
+            "req_id": req_id,
+            "type": "request",
+            "method": request.method,
+            "url": str(request.url),
+        }
+        logger.info(log)
+
+        request.state.req_id = req_id
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            log_error(logger, req_id, e)
+            response = JSONResponse(
+                status_code=500,
+                content={"error": "Internal Server Error"},
+            )
+        response.headers["X-Request-ID"] = str(req_id)
+        log = {
+            "timestamp": dt.datetime.now(dt.UTC).isoformat(),
+            "req_id": req_id,
+            "type": "response",
+            "status_code": response.status_code,
+        }
+        logger.info(log)
+        return response
+
+
+async def endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse("ok")
+
+
+def get_app(middleware: type | None) -> ASGIApp:
+    app = Starlette(routes=[Route("/items", endpoint)])
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def run(app: ASGIApp, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": "/items",
+        "raw_path": b"/items",
+        "root_path": "",
+        "query_string": b"category=Electronics",
+        "headers": [(b"host", b"testserver")],
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def main(requests: int) -> None:
+    apps = {
+        "no middleware     ": get_app(None),
+        "BaseHTTPMiddleware": get_app(BaseHTTPCustomMiddleware),
+        "ASGI middleware   ": get_app(CustomMiddleware),
+    }
+    for app in apps.values():
+        await run(app, min(requests, 1000))
+    results = {name: await run(app, requests) for name, app in apps.items()}
+
+    baseline = results["no middleware     "]
+    print(f"requests={requests}")
+    for name, us in results.items():
+        print(f"{name}: {us:8.1f} us/request  (+{us - baseline:6.1f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--with-logging", action="store_true")
+    args = parser.parse_args()
+    if not args.with_logging:
+        logger.setLevel(logging.WARNING)
+    # As in the app's lifespan, records are written by the listener thread.
+    start_log_listener()
+    asyncio.run(main(args.requests))
+    stop_log_listener()
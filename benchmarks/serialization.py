@@ -0,0 +1,144 @@
+"""CPU time and peak memory of rendering a large /v1/items/query response.
+
+Compares the previous path (``model_dump()`` per row, validation into the
+response model, a second ``response_model`` validation in FastAPI and stdlib
+``json`` rendering) with the current one (validation straight from the query rows
+and a single ``ModelResponse`` serialization pass). Both run through FastAPI
+over ASGI with an in-memory session, so no database is needed.
+
+Usage:
+
+    uv run python -m benchmarks.serialization --items 5000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+from decimal import Decimal
+import time
+import tracemalloc
+from typing import Annotated
+import uuid
+
+from fastapi import Depends, FastAPI
+from starlette.types import ASGIApp, Message
+
+from app.configs.utils import get_settings
+from app.database.dbmodels import DBItem
+from app.routers.items.datamodels import ItemQuery, ResponseFilterItems
+from app.routers.items.service import filter_items
+from app.utils.responses import ModelResponse
+
+
+class InMemoryResult:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def all(self) -> list:
+        return self.rows
+
+
+class InMemorySession:
+    def __init__(self, items_db: list[DBItem]) -> None:
+        self.items_db = items_db
+
+    async def exec(self, query: object) -> InMemoryResult:
+        return InMemoryResult(self.items_db)
+
+
+def get_items_db(count: int) -> list[DBItem]:
+    now = dt.datetime.now(dt.UTC)
+    return [
+        DBItem(
+            item_id=uuid.uuid4(),
+            name=f"Item {i} with a reasonably long product name",
+            category="Electronics",
+            subcategories=["Laptops", "Computers"],
+            price=Decimal("1199.99"),
+            brand="APPLE",
+            description="A description of the item that is rendered on the product page.",
+            features={"color": "silver", "memory_gb": 16, "ports": ["usb-c", "hdmi"]},
+            created_at=now,
+            updated_at=now,
+            stock=10,
+        )
+        for i in range(count)
+    ]
+
+
+def get_app(items_db: list[DBItem]) -> FastAPI:
+    settings = get_settings().model_copy(update={"items_query_max_limit": len(items_db)})
+    item_query = ItemQuery(limit=len(items_db))
+    app = FastAPI()
+
+    def get_db() -> InMemorySession:
+        return InMemorySession(items_db)
+
+    @app.get("/previous", response_model=ResponseFilterItems, response_model_exclude_none=True)
+    async def get_previous() -> ResponseFilterItems:
+        return ResponseFilterItems(items=[item_db.model_dump() for item_db in items_db])
+
+    @app.get("/current", response_model=ResponseFilterItems, response_model_exclude_none=True)
+    async def get_current(db: Annotated[InMemorySession, Depends(get_db)]) -> ModelResponse:
+        return ModelResponse(await filter_items(settings, item_query, db), exclude_none=True)
+
+    return app
+
+
+async def request(app: ASGIApp, path: str) -> bytes:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+    }
+    body = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def measure(app: ASGIApp, path: str, repeat: int) -> tuple[float, float, int]:
+    await request(app, path)
+    start = time.process_time()
+    for _ in range(repeat):
+        body = await request(app, path)
+    cpu_ms = (time.process_time() - start) / repeat * 1000
+
+    tracemalloc.start()
+    await request(app, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1024 / 1024, len(body)
+
+
+async def main(items: int, repeat: int) -> None:
+    app = get_app(get_items_db(items))
+    assert await request(app, "/previous") == await request(app, "/current")
+
+    print(f"items={items} repeat={repeat}")
+    for name, path in (("previous", "/previous"), ("current ", "/current")):
+        cpu_ms, peak_mb, size = await measure(app, path, repeat)
+        print(f"{name}: {cpu_ms:8.1f} ms CPU/request  {peak_mb:7.1f} MiB peak  {size} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.repeat))
@@ -0,0 +1,91 @@
+"""Cold start import time of the API, measured with ``python -X importtime``.
+
+Imports ``--module`` in ``--runs`` fresh interpreters and reports the fastest
+run, which is the least disturbed by the machine's other work, with the
+packages and modules that took the longest themselves.
+
+Absolute times depend on the machine, so the budget is relative: each run is
+paired with one importing only the ``--baseline`` frameworks the app is built
+on, and ``--max-ratio`` bounds the app's import time over theirs. CI uses this
+to keep cold starts from regressing as the app grows, on runners of any speed.
+
+Usage:
+
+    uv run python -m benchmarks.startup --runs 5 --top 15
+    uv run python -m benchmarks.startup --max-ratio 2.0
+"""
+
+import argparse
+from collections import Counter
+import subprocess
+import sys
+
+BASELINE = "fastapi,sqlalchemy.ext.asyncio,sqlmodel,pydantic_settings"
+
+
+def measure(modules: list[str]) -> tuple[int, dict[str, tuple[int, int]]]:
+    # Total microseconds importing `modules`, and self and cumulative microseconds per
+    # imported module, as reported by -X importtime.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise SystemExit(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+    total_us = 0
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+        # Names are indented by nesting, a top-level import has the single separator space.
+        if not name.startswith("  ") and name.strip() in modules:
+            total_us += int(cumulative_us)
+    return total_us, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--baseline", default=BASELINE, help="Comma-separated modules.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--max-ratio", type=float, help="Exit 1 when the import takes longer than this x baseline."
+    )
+    args = parser.parse_args()
+
+    # Interleaved, so a slow phase of the machine hits both sides alike.
+    runs, baseline_totals = [], []
+    for _ in range(args.runs):
+        runs.append(measure([args.module]))
+        baseline_totals.append(measure(args.baseline.split(","))[0])
+    total_us, timings = min(runs, key=lambda run: run[0])
+    ratio = total_us / min(baseline_totals)
+
+    packages = Counter()
+    for name, (self_us, _) in timings.items():
+        packages[name.split(".")[0]] += self_us
+    print(f"{'package':<40} {'self ms':>10}")
+    for name, self_us in packages.most_common(args.top):
+        print(f"{name:<40} {self_us / 1000:>10.1f}")
+    print()
+    print(f"{'module':<40} {'self ms':>10} {'cumul. ms':>10}")
+    modules = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in modules[: args.top]:
+        print(f"{name:<40} {self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}")
+    print()
+    print(f"import {args.module}: {total_us / 1000:.1f} ms (fastest of {args.runs} runs)")
+    print(f"import {args.baseline}: {min(baseline_totals) / 1000:.1f} ms")
+    print(f"ratio: {ratio:.2f}")
+
+    if args.max_ratio is not None and ratio > args.max_ratio:
+        raise SystemExit(f"Over the import time budget of {args.max_ratio:.2f}x the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ ALTER DATABASE generic_ecommerce_api
 
 
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 DROP TABLE IF EXISTS users CASCADE;
 CREATE TABLE users (
@@ -29,9 +30,20 @@ CREATE TABLE items (
     features JSONB,
     created_at TIMESTAMPTZ NOT NULL,
     updated_at TIMESTAMPTZ NOT NULL,
-    stock INT NOT NULL CONSTRAINT stock_non_negative CHECK (stock >= 0)
+    stock INT NOT NULL CONSTRAINT stock_non_negative CHECK (stock >= 0),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', name), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
 );
 
+CREATE INDEX items_search_vector_idx ON items USING GIN (search_vector);
+CREATE INDEX items_name_trgm_idx ON items USING GIN (name gin_trgm_ops);
+-- Equality filters of /v1/items/query, ordered by item_id for keyset pagination.
+CREATE INDEX items_category_item_id_idx ON items (category, item_id);
+CREATE INDEX items_brand_item_id_idx ON items (brand, item_id);
+CREATE INDEX items_subcategories_idx ON items USING GIN (subcategories);
+
 
 DROP TABLE IF EXISTS items_snapshots CASCADE;
 CREATE TABLE items_snapshots (
@@ -102,6 +114,8 @@ CREATE TABLE transactions (
     FOREIGN KEY (delivery_option_id) REFERENCES delivery_options(option_id)
 );
 
+CREATE INDEX transactions_user_id_created_at_idx ON transactions (user_id, created_at);
+
 DROP TABLE IF EXISTS transaction_discounts CASCADE;
 CREATE TABLE transaction_discounts (
     row_id SERIAL PRIMARY KEY,
@@ -112,6 +126,8 @@ CREATE TABLE transaction_discounts (
     FOREIGN KEY (discount_code) REFERENCES discounts(discount_code)
 );
 
+CREATE INDEX transaction_discounts_transaction_id_idx ON transaction_discounts (transaction_id);
+
 DROP TABLE IF EXISTS transaction_items CASCADE;
 CREATE TABLE transaction_items (
     row_id SERIAL PRIMARY KEY,
@@ -125,6 +141,8 @@ CREATE TABLE transaction_items (
     FOREIGN KEY (item_id, updated_at)  REFERENCES items_snapshots(item_id, updated_at)
 );
 
+CREATE INDEX transaction_items_transaction_id_idx ON transaction_items (transaction_id);
+
 
 DROP TABLE IF EXISTS transaction_actions CASCADE;
 CREATE TABLE transaction_actions (
@@ -139,6 +157,11 @@ CREATE TABLE transaction_actions (
     FOREIGN KEY (performed_by) REFERENCES ground_staff(staff_id)
 );
 
+CREATE INDEX transaction_actions_transaction_id_performed_at_idx
+    ON transaction_actions (transaction_id, performed_at);
+CREATE INDEX transaction_actions_finalized_performed_at_idx
+    ON transaction_actions (performed_at) WHERE action = 'REQUEST FINALIZED';
+
 
 DROP TABLE IF EXISTS transactions_finalized CASCADE;
 CREATE TABLE transactions_finalized (
@@ -162,4 +185,22 @@ CREATE TABLE transactions_finalized (
     action_history JSONB NOT NULL
 );
 
+CREATE INDEX transactions_finalized_user_id_idx ON transactions_finalized (user_id);
+
+
+DROP TABLE IF EXISTS idempotency_keys CASCADE;
+CREATE TABLE idempotency_keys (
+    user_id UUID NOT NULL,
+    idempotency_key VARCHAR(256) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    response JSONB,
+    created_at TIMESTAMPTZ NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+
+    PRIMARY KEY (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE INDEX idempotency_keys_expires_at_idx ON idempotency_keys (expires_at);
+
 COMMIT;
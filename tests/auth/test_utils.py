@@ -1,14 +1,22 @@
+import time
+
 import bcrypt
 import jwt
 import pytest
 
+from app.auth import utils as auth_utils
 from app.auth.utils import (
+    PasswordHasher,
+    VerifiedTokenCache,
+    current_user,
     get_access_token,
     get_password_hash,
+    get_password_hasher,
     validate_access_token,
     verify_password,
 )
-from app.exceptions.exceptions import ExcExpiredToken, ExcInvalidToken
+from app.configs.datamodels import Settings
+from app.exceptions.exceptions import ExcAuthBusy, ExcExpiredToken, ExcInvalidToken
 
 SECRET_KEY = "KEYYYYYYY"
 ALGORITHM = "HS256"
@@ -43,6 +51,30 @@ def test_get_password_hash() -> None:
     )
 
 
+@pytest.mark.asyncio
+async def test_password_hasher() -> None:
+    password_hasher = PasswordHasher(max_workers=2, max_pending=2, rounds=4)
+    hashed_password = await password_hasher.hash("testpassword")
+    assert hashed_password.startswith("$2b$04$")
+    assert await password_hasher.verify("testpassword", hashed_password) is True
+    assert await password_hasher.verify("wrongpassword", hashed_password) is False
+    stats = password_hasher.get_stats()
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+    assert stats["queue_time_seconds_max"] >= 0
+    password_hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_busy() -> None:
+    password_hasher = PasswordHasher(max_workers=1, max_pending=1, rounds=4)
+    password_hasher.stats.pending = 1
+    with pytest.raises(ExcAuthBusy):
+        await password_hasher.hash("testpassword")
+    assert password_hasher.stats.rejected == 1
+    password_hasher.shutdown()
+
+
 @pytest.mark.parametrize(
     ("expire_minutes", "key", "expected"),
     [
@@ -92,3 +124,53 @@ def test_validate_access_token(token: str, expected: str | Exception) -> None:
     else:
         with pytest.raises(expected):
             validate_access_token(token=token, secret_key=SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def test_verified_token_cache() -> None:
+    user_id = "a9f0c8f4-7d2b-4a57-9c3e-0b8f4d2e6a11"
+    token = get_access_token(
+        data={"user_id": user_id}, secret_key=SECRET_KEY, algorithm=ALGORITHM, expire_minutes=1
+    )
+    token_cache = VerifiedTokenCache(max_size=10, ttl_seconds=3600)
+    for _ in range(3):
+        assert str(token_cache.get_user_id(token, SECRET_KEY, [ALGORITHM])) == user_id
+    stats = token_cache.get_stats()
+    assert stats["verifications"] == 1
+    assert stats["hits"] == 2
+    # The entry expires with the token, not with the longer cache TTL.
+    expires_at, _ = token_cache._entries[token]
+    assert expires_at <= time.monotonic() + 60
+
+
+def test_verified_token_cache_rejects_invalid_token() -> None:
+    token_cache = VerifiedTokenCache(max_size=10, ttl_seconds=3600)
+    with pytest.raises(ExcInvalidToken):
+        token_cache.get_user_id("not-a-token", SECRET_KEY, [ALGORITHM])
+    assert len(token_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_current_user_runs_on_event_loop() -> None:
+    # A coroutine, FastAPI would run a sync dependency in its threadpool and the token
+    # cache is not thread-safe.
+    settings = Settings()
+    user_id = "a9f0c8f4-7d2b-4a57-9c3e-0b8f4d2e6a11"
+    token = get_access_token(
+        data={"user_id": user_id},
+        secret_key=settings.auth_secret_key,
+        algorithm=settings.auth_algorithm,
+        expire_minutes=1,
+    )
+    assert str(await current_user(settings, token)) == user_id
+
+
+def test_get_password_hasher_splits_across_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = Settings(auth_hash_workers=8, auth_hash_max_pending=64, web_concurrency=4)
+    monkeypatch.setattr(auth_utils, "get_settings", lambda: settings)
+    get_password_hasher.cache_clear()
+    password_hasher = get_password_hasher()
+    try:
+        assert (password_hasher.max_workers, password_hasher.max_pending) == (2, 16)
+    finally:
+        password_hasher.shutdown()
+        get_password_hasher.cache_clear()
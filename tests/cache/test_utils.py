@@ -0,0 +1,65 @@
+from unittest.mock import patch
+
+from app.cache.utils import LRUCache
+
+
+def test_lru_cache_hit_and_miss() -> None:
+    cache = LRUCache(max_size=2, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache = LRUCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+    assert len(cache) == 2
+
+
+def test_lru_cache_expires_entries() -> None:
+    cache = LRUCache(max_size=2, ttl_seconds=10)
+    with patch("app.cache.utils.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+        cache.set("b", 2, expires_at=105.0)
+    with patch("app.cache.utils.time.monotonic", return_value=106.0):
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+    with patch("app.cache.utils.time.monotonic", return_value=110.0):
+        assert cache.get("a") is None
+    assert cache.stats.expirations == 2
+
+
+def test_lru_cache_skips_values_loaded_before_invalidation() -> None:
+    cache = LRUCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    invalidations = cache.stats.invalidations
+    cache.invalidate("a")
+    cache.set("a", 0, invalidations=invalidations)
+    assert cache.get("a") is None
+    cache.set("a", 2, invalidations=cache.stats.invalidations)
+    assert cache.get("a") == 2
+    assert cache.get_stats()["size"] == 1
+
+
+def test_lru_cache_invalidation_only_skips_its_keys() -> None:
+    cache = LRUCache(max_size=2, ttl_seconds=60)
+    invalidations = cache.stats.invalidations
+    cache.invalidate("b")
+    cache.set("a", 1, invalidations=invalidations)
+    assert cache.get("a") == 1
+    # Past max_size invalidated keys are forgotten, fills started before them are skipped.
+    cache.invalidate("c", "d")
+    cache.set("e", 1, invalidations=invalidations)
+    assert cache.get("e") is None
+    cache.clear()
+    cache.set("a", 2, invalidations=invalidations)
+    assert cache.get("a") is None
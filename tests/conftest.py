@@ -1,3 +1,190 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+import contextlib
+from pathlib import Path
+import re
+
 from dotenv import load_dotenv
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 load_dotenv("tests/fixtures/test.environment", override=True)
+
+from app.database.utils import (  # noqa: E402
+    DATABASE_URL,
+    QueryStats,
+    track_engine_queries,
+    track_queries,
+)
+
+
+@pytest.fixture(name="query_budget")
+def fixture_query_budget() -> Callable[[int], contextlib.AbstractContextManager[QueryStats]]:
+    @contextlib.contextmanager
+    def query_budget(max_queries: int) -> Iterator[QueryStats]:
+        with track_queries() as query_stats:
+            yield query_stats
+        # Savepoints come from the rolled back test transaction, not from the service.
+        statements = {
+            statement: count
+            for statement, count in query_stats.statements.items()
+            if not re.match(r"(RELEASE |ROLLBACK TO )?SAVEPOINT", statement)
+        }
+        query_count = sum(statements.values())
+        listing = "\n".join(f"{count}x {statement}" for statement, count in statements.items())
+        assert query_count <= max_queries, (
+            f"{query_count} queries over the budget of {max_queries}:\n{listing}"
+        )
+
+    return query_budget
+
+
+# Seeded into a throwaway schema of the configured database; the tests are skipped
+# when it is unreachable.
+SCHEMA = "query_plans_test"
+SEED_DATA = """
+INSERT INTO ground_staff
+SELECT md5('staff' || i)::uuid, 'Staff ' || i, 'courier' FROM generate_series(1, 10) i;
+
+INSERT INTO delivery_options
+SELECT md5('delivery' || i)::uuid, 'Delivery ' || i, md5('staff' || i)::uuid, 10 * i
+FROM generate_series(1, 3) i;
+
+INSERT INTO discounts
+SELECT 'DISCOUNT_' || i, NULL, now() - interval '1 day', now() + interval '1 day', 10,
+    NULL, ARRAY['Brand ' || i], NULL
+FROM generate_series(1, 20) i;
+
+INSERT INTO items
+SELECT md5('item' || i)::uuid, 'Item ' || i,
+    (ARRAY['Electronics', 'Fashion', 'Home', 'Sports', 'Books', 'Toys', 'Beauty', 'Garden'])[1 + i % 8],
+    ARRAY['sub' || (i % 50), 'sub' || (50 + i % 7)], 1 + i % 1000, 'Brand ' || (i % 200),
+    'Description of item ' || i, '{}', now(), now(), 1000
+FROM generate_series(1, 20000) i;
+
+INSERT INTO items_snapshots
+SELECT item_id, name, category, subcategories, price, brand, description, features,
+    created_at, updated_at
+FROM items;
+
+INSERT INTO users
+SELECT md5('user' || i)::uuid, 'user' || i || '@example.com', '+48' || i, 'hash', now(), now()
+FROM generate_series(1, 5000) i;
+
+INSERT INTO transactions
+SELECT md5('transaction' || i)::uuid, md5('user' || (1 + i % 5000))::uuid,
+    now() - i * interval '1 minute', md5('delivery' || (1 + i % 3))::uuid, 100, 'John', 'Doe',
+    'john@example.com', '+48', 'Poland', 'Krakow', '31-001', 'Wawel', NULL
+FROM generate_series(1, 50000) i;
+
+INSERT INTO transaction_items (transaction_id, item_id, updated_at, count, price_after_discounts)
+SELECT md5('transaction' || i)::uuid, items.item_id, items.updated_at, 1, items.price
+FROM generate_series(1, 50000) i, generate_series(0, 2) j
+JOIN LATERAL (
+    SELECT item_id, updated_at, price FROM items_snapshots
+    WHERE item_id = md5('item' || (1 + (i * 3 + j) % 20000))::uuid
+) items ON true;
+
+INSERT INTO transaction_actions
+SELECT md5('action' || i || '-' || j)::uuid, md5('transaction' || i)::uuid,
+    (ARRAY['PACKED', 'SHIPPED'])[j], NULL, md5('staff' || (1 + i % 10))::uuid,
+    now() - (i * 60 - j) * interval '1 second'
+FROM generate_series(1, 50000) i, generate_series(1, 2) j;
+
+INSERT INTO transaction_actions
+SELECT md5('action' || i || '-3')::uuid, md5('transaction' || i)::uuid, 'REQUEST FINALIZED', NULL,
+    md5('staff' || (1 + i % 10))::uuid, now() - (i * 60 - 3) * interval '1 second'
+FROM generate_series(1, 50000, 100) i;
+
+INSERT INTO transaction_discounts (transaction_id, discount_code)
+SELECT md5('transaction' || i)::uuid, 'DISCOUNT_' || (1 + i % 20)
+FROM generate_series(1, 50000, 2) i;
+
+INSERT INTO transactions_finalized
+SELECT md5('finalized' || i)::uuid, md5('user' || (1 + i % 5000))::uuid, now(), now(), 100,
+    'John', 'Doe', 'john@example.com', '+48', 'Poland', 'Krakow', '31-001', 'Wawel', NULL,
+    '{}', '[]', '[]'
+FROM generate_series(1, 50000) i;
+
+ANALYZE;
+"""
+
+
+def get_test_engine() -> AsyncEngine:
+    engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": f"{SCHEMA},public"}, "timeout": 3},
+    )
+    track_engine_queries(engine)
+    return engine
+
+
+@contextlib.asynccontextmanager
+async def rolled_back_session(engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
+    # Services commit their own transactions, joined to an outer one their commits only
+    # release savepoints, so the session-scoped seed is left as it was for the next test.
+    async with engine.connect() as conn:
+        await conn.begin()
+        async with AsyncSession(
+            bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint"
+        ) as db:
+            yield db
+        await conn.rollback()
+
+
+def get_schema_statements(available_extensions: set[str]) -> list[str]:
+    statements = []
+    sql = Path("postgres/CREATE_TABLES.sql").read_text(encoding="utf-8")
+    for statement in sql.split(";"):
+        statement = "\n".join(
+            line for line in statement.splitlines() if not line.strip().startswith("--")
+        ).strip()
+        # Unqualified DROPs could reach the public schema through the search path.
+        if not statement or re.match(r"(BEGIN|COMMIT|ALTER DATABASE|DROP TABLE)", statement):
+            continue
+        if "pg_trgm" in statement or "gin_trgm_ops" in statement:
+            if "pg_trgm" not in available_extensions:
+                continue
+        if "uuid-ossp" in statement and "uuid-ossp" not in available_extensions:
+            continue
+        statements.append(statement)
+    return statements
+
+
+async def seed_database() -> bool:
+    engine = get_test_engine()
+    try:
+        async with engine.begin() as conn:
+            available_extensions = set(
+                (await conn.exec_driver_sql("SELECT name FROM pg_available_extensions")).scalars()
+            )
+            await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+            for statement in get_schema_statements(available_extensions):
+                await conn.exec_driver_sql(statement)
+            for statement in SEED_DATA.split(";"):
+                if statement.strip():
+                    await conn.exec_driver_sql(statement)
+        return "pg_trgm" in available_extensions
+    finally:
+        await engine.dispose()
+
+
+async def drop_database() -> None:
+    engine = get_test_engine()
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await engine.dispose()
+
+
+@pytest.fixture(name="seeded_database", scope="session")
+def fixture_seeded_database() -> Iterator[bool]:
+    try:
+        fulltext_available = asyncio.run(seed_database())
+    except (OSError, asyncio.TimeoutError) as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    yield fulltext_available
+    asyncio.run(drop_database())
@@ -0,0 +1,428 @@
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractContextManager
+import datetime as dt
+import hashlib
+import re
+import uuid
+
+import pytest
+from sqlalchemy import Row, event, func, insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.configs.datamodels import Settings
+from app.database.dbmodels import (
+    DBDeliveryOptions,
+    DBItem,
+    DBItemSnapshot,
+    DBTransactionAction,
+    DBTransactionItem,
+)
+from app.database.utils import QueryStats, track_queries
+from app.delivery.utils import get_delivery_options_snapshot
+from app.discounts.utils import get_discount_registry
+from app.exceptions.exceptions import (
+    ExcInsufficientStock,
+    ExcItemNotFound,
+    ExcTransactionsActiveFound,
+)
+from app.routers.items.datamodels import ItemQuery, SearchMode
+from app.routers.items.service import filter_items, retrieve_item
+from app.routers.items.utils import encode_cursor, get_item_cache
+from app.routers.transactions.datamodels import (
+    ResponseGetCurrentTransaction,
+    TransactionAction,
+    TransactionCreated,
+    TransactionItem,
+    TransactionToCreate,
+)
+from app.routers.transactions.service import (
+    create_transaction,
+    get_all_current_transactions,
+    get_all_finalized_transactions,
+    get_current_transaction,
+    get_finalized_transaction,
+)
+from app.routers.transactions.utils import (
+    TRANSACTION_ITEMS,
+    TRANSACTIONS,
+    TRANSACTIONS_FINALIZED,
+    finalize_transactions_batch,
+    get_db_items_for_update,
+    get_response_current_transactions,
+    update_db_items_stock,
+)
+from app.routers.user.service import remove_user
+from tests.conftest import get_test_engine, rolled_back_session
+
+LARGE_TABLES = (
+    "items",
+    "items_snapshots",
+    "transactions",
+    "transaction_items",
+    "transaction_actions",
+    "transaction_discounts",
+    "transactions_finalized",
+)
+
+
+async def explain_service_queries(
+    call_service: Callable[[AsyncSession], Awaitable[object]],
+) -> dict[str, str]:
+    engine = get_test_engine()
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "INSERT", "DELETE")):
+            statements.append((statement, parameters))
+
+    plans = {}
+    try:
+        async with rolled_back_session(engine) as db:
+            try:
+                await call_service(db)
+            except ExcTransactionsActiveFound:
+                pass
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        async with engine.connect() as conn:
+            for statement, parameters in statements:
+                result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                plans[statement] = "\n".join(result.scalars())
+            await conn.rollback()
+    finally:
+        await engine.dispose()
+    assert plans
+    return plans
+
+
+def assert_no_seq_scans(plans: dict[str, str]) -> None:
+    for statement, plan in plans.items():
+        for table in LARGE_TABLES:
+            assert not re.search(rf"Seq Scan on {table}\b", plan), f"{statement}\n\n{plan}"
+
+
+def md5_uuid(value: str) -> uuid.UUID:
+    # Same ids as md5(...)::uuid in SEED_DATA.
+    return uuid.UUID(hashlib.md5(value.encode("utf-8")).hexdigest())
+
+
+USER_ID = md5_uuid("user42")
+ITEM_ID = md5_uuid("item42")
+TRANSACTION_ID = md5_uuid("transaction41")
+FINALIZED_ID = md5_uuid("finalized41")
+
+
+@pytest.mark.parametrize(
+    "item_query",
+    [
+        ItemQuery(category="Electronics"),
+        ItemQuery(brand="Brand 7"),
+        ItemQuery(subcategory=["sub7"]),
+        ItemQuery(category="Books", brand="Brand 12", subcategory=["sub12"]),
+        ItemQuery(cursor=encode_cursor(ITEM_ID)),
+        ItemQuery(search="item 42", search_mode=SearchMode.FULLTEXT),
+    ],
+)
+@pytest.mark.asyncio
+async def test_filter_items_uses_indexes(seeded_database: bool, item_query: ItemQuery) -> None:
+    if item_query.search_mode is SearchMode.FULLTEXT and not seeded_database:
+        pytest.skip("pg_trgm is not available")
+    plans = await explain_service_queries(lambda db: filter_items(Settings(), item_query, db))
+    assert_no_seq_scans(plans)
+
+
+def checkout(
+    db: AsyncSession, item_counts: dict[uuid.UUID, int], idempotency_key: str | None = None
+) -> Awaitable[ResponseGetCurrentTransaction]:
+    return create_transaction(
+        Settings(),
+        db,
+        USER_ID,
+        TransactionToCreate(
+            item_ids=item_counts,
+            delivery_option_id=str(md5_uuid("delivery1")),
+            discount_codes=["DISCOUNT_1"],
+            name="John",
+            last_name="Doe",
+            email="john@example.com",
+            phone="+48",
+            country="Poland",
+            city="Krakow",
+            postal_code="31-001",
+            address_line_1="Wawel",
+        ),
+        idempotency_key=idempotency_key,
+    )
+
+
+SERVICE_CALLS: dict[str, Callable[[AsyncSession], Awaitable[object]]] = {
+    "retrieve_item": lambda db: retrieve_item(db, ITEM_ID),
+    "get_all_current_transactions": lambda db: get_all_current_transactions(db, USER_ID),
+    "get_current_transaction": lambda db: get_current_transaction(db, USER_ID, TRANSACTION_ID),
+    "get_all_finalized_transactions": lambda db: get_all_finalized_transactions(db, USER_ID),
+    "get_finalized_transaction": lambda db: get_finalized_transaction(db, USER_ID, FINALIZED_ID),
+    "remove_user": lambda db: remove_user(db, USER_ID),
+    "finalize_transactions_batch": lambda db: finalize_transactions_batch(db, 100),
+    # A fresh key each call, a stored one would only measure the replay of its response.
+    "create_transaction": lambda db: checkout(db, {ITEM_ID: 1}, str(uuid.uuid4())),
+}
+# Upper bounds on the statements each service issues with cold caches. USER_ID has ten
+# current transactions, so a per-transaction query would blow the budget.
+QUERY_BUDGETS = {
+    "retrieve_item": 1,
+    "get_all_current_transactions": 4,
+    "get_current_transaction": 4,
+    "get_all_finalized_transactions": 1,
+    "get_finalized_transaction": 1,
+    "remove_user": 2,
+    "finalize_transactions_batch": 4,
+    "create_transaction": 10,
+}
+
+
+def clear_caches() -> None:
+    get_item_cache().clear()
+    get_discount_registry.cache_clear()
+    get_delivery_options_snapshot.cache_clear()
+
+
+@pytest.mark.parametrize("call_service", SERVICE_CALLS.values(), ids=SERVICE_CALLS.keys())
+@pytest.mark.asyncio
+async def test_service_queries_use_indexes(
+    seeded_database: bool, call_service: Callable[[AsyncSession], Awaitable[object]]
+) -> None:
+    clear_caches()
+    plans = await explain_service_queries(call_service)
+    assert_no_seq_scans(plans)
+
+
+@pytest.mark.parametrize(
+    ("call_service", "max_queries"),
+    [(SERVICE_CALLS[name], QUERY_BUDGETS[name]) for name in SERVICE_CALLS],
+    ids=SERVICE_CALLS.keys(),
+)
+@pytest.mark.asyncio
+async def test_service_queries_within_budget(
+    seeded_database: bool,
+    query_budget: Callable[[int], AbstractContextManager[QueryStats]],
+    call_service: Callable[[AsyncSession], Awaitable[object]],
+    max_queries: int,
+) -> None:
+    clear_caches()
+    engine = get_test_engine()
+    try:
+        async with rolled_back_session(engine) as db:
+            with query_budget(max_queries):
+                try:
+                    await call_service(db)
+                except ExcTransactionsActiveFound:
+                    pass
+    finally:
+        await engine.dispose()
+
+
+CART_ITEM_IDS = [md5_uuid(f"item{i}") for i in range(1000, 1050)]
+UNKNOWN_ITEM_ID = md5_uuid("item0")
+
+
+async def get_stocks(db: AsyncSession, item_ids: list[uuid.UUID]) -> dict[uuid.UUID, int]:
+    query = select(DBItem.item_id, DBItem.stock).where(DBItem.item_id.in_(item_ids))
+    return dict((await db.exec(query)).all())
+
+
+@pytest.mark.asyncio
+async def test_create_transaction_queries_independent_of_cart_size(seeded_database: bool) -> None:
+    query_counts = []
+    for item_ids in (CART_ITEM_IDS[:1], CART_ITEM_IDS):
+        clear_caches()
+        engine = get_test_engine()
+        try:
+            async with rolled_back_session(engine) as db:
+                with track_queries() as query_stats:
+                    response = await checkout(db, dict.fromkeys(item_ids, 1), str(uuid.uuid4()))
+        finally:
+            await engine.dispose()
+        assert len(response.items) == len(item_ids)
+        query_counts.append(query_stats.count)
+    assert query_counts[0] == query_counts[1]
+
+
+@pytest.mark.parametrize(
+    ("item_counts", "exception"),
+    [
+        ({**dict.fromkeys(CART_ITEM_IDS, 1), CART_ITEM_IDS[-1]: 10**6}, ExcInsufficientStock),
+        ({**dict.fromkeys(CART_ITEM_IDS, 1), UNKNOWN_ITEM_ID: 1}, ExcItemNotFound),
+    ],
+    ids=["insufficient_stock", "unknown_item"],
+)
+@pytest.mark.asyncio
+async def test_create_transaction_fails_whole_cart(
+    seeded_database: bool, item_counts: dict[uuid.UUID, int], exception: type[Exception]
+) -> None:
+    engine = get_test_engine()
+    try:
+        async with rolled_back_session(engine) as db:
+            stocks = await get_stocks(db, CART_ITEM_IDS)
+            with pytest.raises(exception):
+                await checkout(db, item_counts)
+            assert await get_stocks(db, CART_ITEM_IDS) == stocks
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize(
+    ("item_counts", "sold_out", "exception"),
+    [
+        (dict.fromkeys(CART_ITEM_IDS, 1), True, ExcInsufficientStock),
+        ({**dict.fromkeys(CART_ITEM_IDS, 1), UNKNOWN_ITEM_ID: 1}, False, ExcItemNotFound),
+    ],
+    ids=["insufficient_stock", "unknown_item"],
+)
+@pytest.mark.asyncio
+async def test_update_db_items_stock_fails_whole_cart(
+    seeded_database: bool,
+    item_counts: dict[uuid.UUID, int],
+    sold_out: bool,
+    exception: type[Exception],
+) -> None:
+    # The stock UPDATE rechecks every line, even past a stale or incomplete locked read.
+    engine = get_test_engine()
+    try:
+        async with rolled_back_session(engine) as db:
+            stocks = await get_stocks(db, CART_ITEM_IDS)
+            items_db = await get_db_items_for_update(db, dict.fromkeys(CART_ITEM_IDS, 1))
+            if sold_out:
+                await db.exec(
+                    update(DBItem).where(DBItem.item_id == CART_ITEM_IDS[-1]).values(stock=0)
+                )
+            with pytest.raises(exception):
+                await update_db_items_stock(db, items_db, item_counts)
+            await db.rollback()
+            assert await get_stocks(db, CART_ITEM_IDS) == stocks
+    finally:
+        await engine.dispose()
+
+
+async def assemble_current_transaction(
+    db: AsyncSession, transaction_row: Row
+) -> ResponseGetCurrentTransaction:
+    # The per-transaction assembly get_response_current_transactions replaced.
+    query = select(DBDeliveryOptions).where(
+        DBDeliveryOptions.option_id == transaction_row.delivery_option_id
+    )
+    delivery_option_db = (await db.exec(query)).one()
+    query = (
+        select(DBTransactionItem)
+        .where(DBTransactionItem.transaction_id == transaction_row.transaction_id)
+        .order_by(DBTransactionItem.row_id)
+    )
+    transaction_items = []
+    for transaction_item_db in (await db.exec(query)).all():
+        query = select(DBItemSnapshot).where(
+            (DBItemSnapshot.item_id == transaction_item_db.item_id)
+            & (DBItemSnapshot.updated_at == transaction_item_db.updated_at)
+        )
+        item_db = (await db.exec(query)).one()
+        transaction_items.append(
+            TransactionItem(
+                **item_db.model_dump(),
+                **transaction_item_db.model_dump(exclude={"item_id", "updated_at"}),
+                price_unit=item_db.price,
+            )
+        )
+    query = (
+        select(DBTransactionAction)
+        .where(DBTransactionAction.transaction_id == transaction_row.transaction_id)
+        .order_by(DBTransactionAction.performed_at)
+    )
+    transaction_actions = [
+        TransactionAction.model_validate(transaction_action_db, from_attributes=True)
+        for transaction_action_db in await db.exec(query)
+    ]
+    return ResponseGetCurrentTransaction(
+        transaction=TransactionCreated(
+            **transaction_row._mapping,
+            delivery_option=delivery_option_db.name,
+            delivery_price=delivery_option_db.price,
+        ),
+        items=transaction_items,
+        actions=transaction_actions,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_response_current_transactions(seeded_database: bool) -> None:
+    engine = get_test_engine()
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            query = (
+                select(*TRANSACTIONS.c)
+                .where(TRANSACTIONS.c.user_id == USER_ID)
+                .order_by(TRANSACTIONS.c.created_at)
+            )
+            transaction_rows = (await db.exec(query)).all()
+            assert len(transaction_rows) >= 10
+
+            query_counts = []
+            for rows in (transaction_rows[:1], transaction_rows):
+                clear_caches()
+                with track_queries() as query_stats:
+                    response_transactions = await get_response_current_transactions(db, rows)
+                query_counts.append(query_stats.count)
+            assert query_counts[0] == query_counts[1]
+
+            assert response_transactions == [
+                await assemble_current_transaction(db, transaction_row)
+                for transaction_row in transaction_rows
+            ]
+            assert all(response.items for response in response_transactions)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_transaction_items_require_snapshot(seeded_database: bool) -> None:
+    # Line items are inner joined to their snapshots, the foreign key guarantees one exists.
+    engine = get_test_engine()
+    try:
+        async with engine.connect() as conn:
+            with pytest.raises(IntegrityError):
+                await conn.execute(
+                    insert(TRANSACTION_ITEMS).values(
+                        transaction_id=TRANSACTION_ID,
+                        item_id=ITEM_ID,
+                        updated_at=dt.datetime(2000, 1, 1, tzinfo=dt.UTC),
+                        count=1,
+                        price_after_discounts=1,
+                    )
+                )
+            await conn.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_finalize_transactions_batch_repeated_requests(seeded_database: bool) -> None:
+    engine = get_test_engine()
+    count_finalized = select(func.count()).select_from(TRANSACTIONS_FINALIZED)
+    try:
+        async with rolled_back_session(engine) as db:
+            # Every pending transaction asks to be finalized a second time, at the same time.
+            await db.exec(
+                text(
+                    """
+                    INSERT INTO transaction_actions
+                    SELECT gen_random_uuid(), transaction_id, action, description, performed_by,
+                        performed_at
+                    FROM transaction_actions WHERE action = 'REQUEST FINALIZED'
+                    """
+                )
+            )
+            finalized_count = (await db.exec(count_finalized)).one()
+            await db.commit()
+            assert await finalize_transactions_batch(db, 10) == 10
+            assert (await db.exec(count_finalized)).one() == finalized_count + 10
+    finally:
+        await engine.dispose()
@@ -1,8 +1,47 @@
-from sqlmodel import Session
+import pytest
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database.utils import get_db_session
+from app.configs.datamodels import Settings
+from app.database.dbmodels import DBItem
+from app.database.utils import (
+    QUERY_STATS,
+    get_columns,
+    get_db_session,
+    get_pool_limits,
+    track_queries,
+)
 
 
-def test_get_db_session() -> None:
-    with next(get_db_session()) as session:
-        assert isinstance(session, Session)
+@pytest.mark.asyncio
+async def test_get_db_session() -> None:
+    session_generator = get_db_session()
+    session = await anext(session_generator)
+    assert isinstance(session, AsyncSession)
+    await session_generator.aclose()
+
+
+def test_get_columns() -> None:
+    columns = get_columns(DBItem, ["item_id", "name"])
+    assert columns == (DBItem.__table__.c.item_id, DBItem.__table__.c.name)
+    assert not select(*columns)._propagate_attrs
+
+
+def test_track_queries() -> None:
+    assert QUERY_STATS.get() is None
+    with track_queries() as query_stats:
+        assert QUERY_STATS.get() is query_stats
+        for _ in range(3):
+            query_stats.record("SELECT 1", 0.5)
+        query_stats.record("SELECT 2", 0.25)
+    assert QUERY_STATS.get() is None
+    assert query_stats.count == 4
+    assert query_stats.duration == 1.75
+    assert query_stats.get_repeated(3) == {"SELECT 1": 3}
+
+
+def test_get_pool_limits() -> None:
+    settings = Settings(db_pool_size=20, db_max_overflow=30, web_concurrency=4)
+    assert get_pool_limits(settings) == (5, 7)
+    settings = Settings(db_pool_size=2, db_max_overflow=0, web_concurrency=4)
+    assert get_pool_limits(settings) == (1, 0)
@@ -0,0 +1,45 @@
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+import uuid
+
+import pytest
+
+from app.database.dbmodels import DBDeliveryOptions
+from app.delivery.utils import DeliveryOptionsSnapshot
+
+OPTION_ID = uuid.uuid4()
+
+
+@pytest.mark.asyncio
+async def test_delivery_options_snapshot() -> None:
+    mock_db_session = Mock()
+    mock_db_session.exec = AsyncMock(
+        return_value=[
+            DBDeliveryOptions(
+                option_id=OPTION_ID, name="Courier", contractor_id=uuid.uuid4(), price=Decimal("15")
+            )
+        ]
+    )
+    snapshot = DeliveryOptionsSnapshot(min_refresh_seconds=10)
+    with patch("app.delivery.utils.time.monotonic", return_value=100.0):
+        await snapshot.refresh(mock_db_session)
+    options = snapshot.options
+
+    delivery_options = await snapshot.get_many(mock_db_session, [OPTION_ID])
+    assert delivery_options[OPTION_ID].name == "Courier"
+    mock_db_session.exec.assert_awaited_once()
+
+    # Unknown ids reload the snapshot at most once per min_refresh_seconds.
+    with patch("app.delivery.utils.time.monotonic", return_value=105.0):
+        assert await snapshot.get_many(mock_db_session, [uuid.uuid4()]) == {}
+    mock_db_session.exec.assert_awaited_once()
+    assert snapshot.options is options
+
+    # Once due, they reload it once and swap it as a whole.
+    with patch("app.delivery.utils.time.monotonic", return_value=110.0):
+        assert await snapshot.get_many(mock_db_session, [uuid.uuid4()]) == {}
+        assert await snapshot.get_many(mock_db_session, [uuid.uuid4()]) == {}
+    assert mock_db_session.exec.await_count == 2
+    assert snapshot.options is not options
+    with pytest.raises(TypeError):
+        snapshot.options[uuid.uuid4()] = options[OPTION_ID]
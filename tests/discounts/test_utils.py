@@ -0,0 +1,88 @@
+import datetime as dt
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+import uuid
+
+import pytest
+
+from app.database.dbmodels import DBDiscount, DBItem
+from app.discounts.utils import DiscountMatcher, DiscountRegistry
+
+NOW = dt.datetime(2026, 1, 1, tzinfo=dt.UTC)
+ITEM_ID = uuid.uuid4()
+
+
+def get_discount(**kwargs: object) -> DBDiscount:
+    return DBDiscount(
+        **dict(
+            dict(
+                discount_code="CODE",
+                valid_from=NOW - dt.timedelta(days=1),
+                valid_to=NOW + dt.timedelta(days=1),
+                discount_percentage=Decimal("10"),
+            ),
+            **kwargs,
+        )
+    )
+
+
+def get_item(**kwargs: object) -> DBItem:
+    return DBItem(
+        **dict(
+            dict(
+                item_id=ITEM_ID,
+                name="MacBook",
+                category="Electronics",
+                subcategories=["Laptops", "Computers"],
+                price=Decimal("100"),
+                brand="APPLE",
+                stock=1,
+            ),
+            **kwargs,
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    ("discount", "item", "expected"),
+    [
+        (get_discount(), get_item(), True),
+        (get_discount(item_ids=[ITEM_ID]), get_item(), True),
+        (get_discount(item_ids=[uuid.uuid4()]), get_item(), False),
+        (get_discount(brands=["APPLE"]), get_item(), True),
+        (get_discount(brands=["SONY"]), get_item(), False),
+        (get_discount(categories={"Electronics": ["Laptops"]}), get_item(), True),
+        (get_discount(categories={"Electronics": ["Phones"]}), get_item(), False),
+        (get_discount(categories={"Fashion": ["Shoes"]}), get_item(), False),
+        (
+            get_discount(categories={"Electronics": ["Laptops"]}),
+            get_item(subcategories=None),
+            False,
+        ),
+    ],
+)
+def test_discount_matcher(discount: DBDiscount, item: DBItem, expected: bool) -> None:
+    matcher = DiscountMatcher.from_db(discount)
+    assert matcher.matches(item) is expected
+    assert matcher.multiplier == Decimal("0.9")
+
+
+@pytest.mark.asyncio
+async def test_discount_registry_switches_at_validity_boundaries() -> None:
+    discounts = [
+        get_discount(discount_code="ACTIVE"),
+        get_discount(discount_code="UPCOMING", valid_from=NOW + dt.timedelta(hours=1)),
+    ]
+    mock_db_session = Mock()
+    mock_db_session.exec = AsyncMock(return_value=discounts)
+    registry = DiscountRegistry(refresh_seconds=3600)
+
+    with patch("app.discounts.utils.dt.datetime") as mock_datetime:
+        mock_datetime.now.return_value = NOW
+        assert set(await registry.get_active(mock_db_session)) == {"ACTIVE"}
+        mock_datetime.now.return_value = NOW + dt.timedelta(hours=2)
+        assert set(await registry.get_active(mock_db_session)) == {"ACTIVE", "UPCOMING"}
+        mock_datetime.now.return_value = NOW + dt.timedelta(days=2)
+        assert set(await registry.get_active(mock_db_session)) == set()
+
+    mock_db_session.exec.assert_awaited_once()
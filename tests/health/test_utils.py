@@ -0,0 +1,60 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.health.utils import HealthProber
+
+
+def get_health_prober(checked_out: int = 0, interval_seconds: float = 60.0) -> HealthProber:
+    pool = Mock()
+    pool.checkedout.return_value = checked_out
+    health_prober = HealthProber(
+        pool=pool,
+        pool_capacity=10,
+        probe_engine=Mock(dispose=AsyncMock()),
+        interval_seconds=interval_seconds,
+        db_timeout_seconds=1.0,
+        max_pool_saturation=0.9,
+        max_loop_lag_seconds=0.05,
+    )
+    health_prober.probe_db = AsyncMock(return_value=(0.001, None))
+    return health_prober
+
+
+@pytest.mark.asyncio
+async def test_health_prober_readiness() -> None:
+    health_prober = get_health_prober()
+    assert health_prober.get_readiness_failures() == ["starting"]
+    assert not health_prober.is_live()
+
+    await health_prober.start()
+    assert health_prober.get_readiness_failures() == []
+    assert health_prober.is_live()
+
+    health_prober.pool.checkedout.return_value = 9
+    health_prober.probe_db.return_value = (None, "OSError()")
+    health_prober.update(await health_prober.probe(0.0))
+    assert health_prober.get_readiness_failures() == [
+        "database unreachable",
+        "connection pool saturated",
+    ]
+
+    await health_prober.stop()
+    assert not health_prober.is_live()
+    assert "health state stale" in health_prober.get_readiness_failures()
+    health_prober.probe_engine.dispose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_health_prober_loop_lag() -> None:
+    health_prober = get_health_prober(interval_seconds=0.05)
+    await health_prober.start()
+    await asyncio.sleep(0)
+    # Blocks the event loop past the prober's next wake-up.
+    time.sleep(0.2)
+    await asyncio.sleep(0.01)
+    assert health_prober.state.loop_lag_seconds >= 0.1
+    assert health_prober.get_readiness_failures() == ["event loop lagging"]
+    await health_prober.stop()
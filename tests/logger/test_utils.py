@@ -0,0 +1,68 @@
+import datetime as dt
+import logging
+from pathlib import Path
+import queue
+import sys
+import time
+from unittest.mock import Mock
+import uuid
+
+import orjson
+import pytest
+
+from app.logger import utils as logger_utils
+from app.logger.utils import LogFormatterJson, LogQueueHandler, SharedTimedRotatingFileHandler
+
+
+def test_log_formatter_json() -> None:
+    req_id = uuid.uuid4()
+    timestamp = dt.datetime(2026, 1, 1, tzinfo=dt.UTC)
+    record = logging.makeLogRecord(
+        {"msg": {"req_id": req_id, "timestamp": timestamp, "other": object}, "levelname": "INFO"}
+    )
+    log_record = orjson.loads(LogFormatterJson().format(record))
+    assert log_record["log_type"] == "struct"
+    assert log_record["log"]["req_id"] == str(req_id)
+    assert log_record["log"]["timestamp"] == "2026-01-01T00:00:00+00:00"
+    assert log_record["log"]["other"] == str(object)
+
+
+def test_log_queue_handler_keeps_dict_messages(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(logger_utils, "is_log_listener_running", lambda: True)
+    log_queue = queue.SimpleQueue()
+    handler = LogQueueHandler(log_queue)
+    record = logging.makeLogRecord({"msg": {"type": "access"}})
+    handler.emit(record)
+    assert log_queue.get_nowait().msg == {"type": "access"}
+
+
+def test_log_queue_handler_without_listener(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Outside the lifespan, e.g. after shutdown, records are handled without a thread.
+    listener = Mock()
+    monkeypatch.setattr(logger_utils, "is_log_listener_running", lambda: False)
+    monkeypatch.setattr(logger_utils, "get_log_listener", lambda: listener)
+    log_queue = queue.SimpleQueue()
+    handler = LogQueueHandler(log_queue)
+    record = logging.makeLogRecord({"msg": {"type": "access"}})
+    handler.emit(record)
+    listener.handle.assert_called_once_with(record)
+    listener.start.assert_not_called()
+    assert log_queue.empty()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Open files cannot be renamed on Windows.")
+def test_shared_timed_rotating_file_handler_rotates_once(tmp_path: Path) -> None:
+    filename = tmp_path / "app.log"
+    handlers = [
+        SharedTimedRotatingFileHandler(str(filename), when="M", interval=5, utc=True)
+        for _ in range(2)
+    ]
+    for handler in handlers:
+        handler.rolloverAt = int(time.time()) - 1
+    for i, handler in enumerate(handlers):
+        handler.emit(logging.makeLogRecord({"msg": f"worker {i}"}))
+        handler.close()
+    # The first handler rotated, the second one reopened the new file instead.
+    (rotated,) = tmp_path.glob("app.log.*-*")
+    assert rotated.read_text() == ""
+    assert filename.read_text() == "worker 0\nworker 1\n"
@@ -0,0 +1,69 @@
+from unittest.mock import Mock
+
+from app.cache.utils import LRUCache
+from app.metrics.utils import Histogram, Metrics, render_metrics
+
+
+def test_histogram() -> None:
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+
+
+def test_render_metrics() -> None:
+    metrics = Metrics()
+    metrics.observe_request("GET", "/v1/items/item/{item_id}", 200, 0.004)
+    metrics.observe_request("GET", "/v1/items/item/{item_id}", 404, 0.002)
+    metrics.observe_request("GET", 'say "hi"', 200, 20.0)
+    metrics.db_pool_checkout.observe(0.0005)
+    pool = Mock(
+        size=Mock(return_value=20),
+        checkedout=Mock(return_value=3),
+        checkedin=Mock(return_value=5),
+        overflow=Mock(return_value=-12),
+    )
+    password_hasher = dict(
+        completed=4, rejected=1, pending=0, queue_time_seconds_total=0.5, run_time_seconds_total=1.0
+    )
+
+    caches = {
+        "items": LRUCache(10, 1.0).get_stats(),
+        "auth_tokens": dict(
+            LRUCache(10, 1.0).get_stats(), hits=3, misses=1, time_saved_seconds_total=0.25
+        ),
+    }
+
+    lines = render_metrics(metrics, pool, caches, password_hasher).splitlines()
+
+    assert "# TYPE http_requests_total counter" in lines
+    assert (
+        'http_requests_total{method="GET",route="/v1/items/item/{item_id}",status_code="404"} 1'
+        in lines
+    )
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/v1/items/item/{item_id}",le="0.005"} 2'
+        in lines
+    )
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="say \\"hi\\"",le="10.0"} 0'
+        in lines
+    )
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="say \\"hi\\"",le="+Inf"} 1'
+        in lines
+    )
+    assert 'http_request_duration_seconds_count{method="GET",route="say \\"hi\\""} 1' in lines
+    assert "db_pool_checked_out 3" in lines
+    assert "db_pool_overflow 0" in lines
+    assert 'db_pool_checkout_seconds_bucket{le="0.001"} 1' in lines
+    assert 'cache_max_size{cache="items"} 10' in lines
+    assert 'cache_hit_rate{cache="items"} 0.0' in lines
+    assert 'cache_hit_rate{cache="auth_tokens"} 0.75' in lines
+    assert 'cache_time_saved_seconds_total{cache="auth_tokens"} 0.25' in lines
+    assert not any(
+        line.startswith('cache_time_saved_seconds_total{cache="items"}') for line in lines
+    )
+    assert "password_hasher_rejected_total 1" in lines
@@ -0,0 +1,103 @@
+from collections.abc import AsyncIterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import pytest
+
+from app.configs.datamodels import Environment
+from app.metrics.utils import get_metrics
+from app.middleware import middleware
+from app.middleware.middleware import CustomMiddleware
+
+app = FastAPI()
+app.add_middleware(CustomMiddleware)
+
+
+@app.get("/req-id")
+async def get_req_id(request: Request) -> dict:
+    return {"req_id": str(request.state.req_id)}
+
+
+@app.get("/queries")
+async def get_queries(request: Request) -> dict:
+    for _ in range(3):
+        request.state.query_stats.record("SELECT 1", 0.001)
+    return {}
+
+
+@app.get("/error")
+async def get_error() -> dict:
+    raise RuntimeError("boom")
+
+
+@app.get("/stream-error")
+async def get_stream_error() -> StreamingResponse:
+    async def stream() -> AsyncIterator[bytes]:
+        yield b"{}\n"
+        raise RuntimeError("boom")
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def test_custom_middleware_sets_request_id() -> None:
+    with TestClient(app) as client:
+        response = client.get("/req-id", params={"q": "1"})
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == response.json()["req_id"]
+
+
+def test_custom_middleware_handles_errors() -> None:
+    with TestClient(app, raise_server_exceptions=False) as client:
+        response = client.get("/error")
+    assert response.status_code == 500
+    assert response.json() == {"error": "Internal Server Error"}
+    assert "X-Request-ID" in response.headers
+
+
+def test_custom_middleware_records_metrics() -> None:
+    get_metrics.cache_clear()
+    with TestClient(app, raise_server_exceptions=False) as client:
+        client.get("/req-id")
+        client.get("/error")
+        client.get("/missing")
+    assert get_metrics().http_requests == {
+        ("GET", "/req-id", 200): 1,
+        ("GET", "/error", 500): 1,
+        ("GET", "unmatched", 404): 1,
+    }
+    assert get_metrics().http_request_duration[("GET", "/req-id")].count == 1
+
+
+def test_custom_middleware_records_failed_streams(monkeypatch: pytest.MonkeyPatch) -> None:
+    get_metrics.cache_clear()
+    logs = []
+    monkeypatch.setattr(middleware.logger, "info", logs.append)
+    with TestClient(app) as client:
+        with pytest.raises(RuntimeError):
+            client.get("/stream-error")
+    assert get_metrics().http_requests == {("GET", "/stream-error", 500): 1}
+    (access_log,) = logs
+    assert access_log["status_code"] == 500
+
+
+def test_custom_middleware_reports_queries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(middleware.settings, "environment", Environment.DEVELOPMENT)
+    monkeypatch.setattr(middleware.settings, "db_repeated_query_threshold", 3)
+    logs = []
+    monkeypatch.setattr(middleware.logger, "info", logs.append)
+    monkeypatch.setattr(middleware.logger, "warning", logs.append)
+    with TestClient(app) as client:
+        response = client.get("/queries")
+    assert response.headers["X-DB-Queries"] == "3"
+    assert response.headers["X-DB-Time-MS"] == "3.0"
+    repeated_log, access_log = logs
+    assert repeated_log["repeated_queries"] == {"SELECT 1": 3}
+    assert access_log["db_queries"] == 3
+    assert access_log["db_time_ms"] == 3.0
+
+
+def test_custom_middleware_hides_query_headers_outside_development() -> None:
+    with TestClient(app) as client:
+        response = client.get("/queries")
+    assert "X-DB-Queries" not in response.headers
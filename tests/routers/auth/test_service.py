@@ -1,4 +1,4 @@
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
@@ -12,6 +12,7 @@ from app.routers.auth.auth import get_token
 @patch("app.routers.auth.service.select")
 async def test_get_token(mock_select: Mock, mock_get_access_token: Mock) -> None:
     mock_db_session = Mock()
+    mock_db_session.exec = AsyncMock(return_value=Mock())
     mock_db_session.exec.return_value.first.return_value = Mock(
         user_id=1,
         email="testuser",
@@ -30,7 +31,7 @@ async def test_get_token(mock_select: Mock, mock_get_access_token: Mock) -> None
     )
     mock_select.assert_called_once()
     mock_select.return_value.where.assert_called_once()
-    mock_db_session.exec.assert_called_once_with(mock_select.return_value.where.return_value)
+    mock_db_session.exec.assert_awaited_once_with(mock_select.return_value.where.return_value)
     mock_get_access_token.assert_called_once_with(
         data={"user_id": "1"},
         secret_key=Settings().auth_secret_key,
@@ -0,0 +1,77 @@
+from collections.abc import AsyncIterator, Callable, Iterator
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.configs.datamodels import Settings
+from app.configs.utils import get_settings
+from app.database.utils import get_db_session
+from app.main import app
+from tests.conftest import get_test_engine
+
+
+async def get_test_db_session() -> AsyncIterator[AsyncSession]:
+    engine = get_test_engine()
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(name="client")
+def fixture_client(seeded_database: bool) -> Iterator[Callable[[int], TestClient]]:
+    def get_client(items_query_max_limit: int) -> TestClient:
+        settings = Settings(items_query_max_limit=items_query_max_limit)
+        app.dependency_overrides[get_settings] = lambda: settings
+        return TestClient(app)
+
+    app.dependency_overrides[get_db_session] = get_test_db_session
+    yield get_client
+    app.dependency_overrides.clear()
+
+
+def get_all_pages(client: TestClient, params: dict) -> list[dict]:
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(
+            "/v1/items/query", params={**params, "cursor": cursor} if cursor else params
+        )
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = pages[-1].get("next_cursor")
+        if not cursor:
+            return pages
+
+
+def test_filter_items_next_cursor(client: Callable[[int], TestClient]) -> None:
+    # 100 seeded items are in Books from Brand 12, two full pages of 50.
+    pages = get_all_pages(client(100), {"category": "Books", "brand": "Brand 12", "limit": 50})
+    assert [len(page["items"]) for page in pages] == [50, 50]
+    assert "next_cursor" in pages[0]
+    assert "next_cursor" not in pages[1]
+    item_ids = [item["item_id"] for page in pages for item in page["items"]]
+    assert item_ids == sorted(set(item_ids))
+
+
+def test_filter_items_limit_clamped(client: Callable[[int], TestClient]) -> None:
+    response = client(30).get("/v1/items/query", params={"category": "Books", "limit": 1000})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 30
+    assert "next_cursor" in response.json()
+
+
+def test_filter_items_search_rank_pages(
+    seeded_database: bool, client: Callable[[int], TestClient]
+) -> None:
+    if not seeded_database:
+        pytest.skip("pg_trgm is not available")
+    # Many matches tie on rank, their pages are ordered by item_id within it.
+    params = {"search": "item 42", "search_mode": "fulltext"}
+    (page,) = get_all_pages(client(20000), {**params, "limit": 20000})
+    pages = get_all_pages(client(20000), {**params, "limit": 7})
+    item_ids = [item["item_id"] for page in pages for item in page["items"]]
+    assert len(pages) > 2
+    assert item_ids == [item["item_id"] for item in page["items"]]
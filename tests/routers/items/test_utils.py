@@ -0,0 +1,27 @@
+import uuid
+
+import pytest
+
+from app.exceptions.exceptions import ExcInvalidCursor
+from app.routers.items.utils import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("rank", [None, 0.0, 0.123456789])
+def test_cursor_round_trip(rank: float | None) -> None:
+    item_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(item_id, rank)) == (item_id, rank)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-base64!",
+        "bm90LWpzb24=",  # "not-json"
+        "eyJmb28iOiAiYmFyIn0=",  # {"foo": "bar"}
+        "eyJpdGVtX2lkIjogIjEyMyJ9",  # {"item_id": "123"}
+        "WzFd",  # [1]
+    ],
+)
+def test_decode_cursor_invalid(cursor: str) -> None:
+    with pytest.raises(ExcInvalidCursor):
+        decode_cursor(cursor)
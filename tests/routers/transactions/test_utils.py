@@ -0,0 +1,98 @@
+from unittest.mock import AsyncMock, MagicMock, Mock
+import uuid
+
+import pytest
+
+from app.configs.datamodels import Settings
+from app.exceptions.exceptions import ExcIdempotencyKeyReused
+from app.routers.transactions import utils as transactions_utils
+from app.routers.transactions.datamodels import TransactionToCreate
+from app.routers.transactions.utils import claim_idempotency_key, get_request_hash
+
+ITEM_IDS = [uuid.uuid4(), uuid.uuid4()]
+
+
+def get_transaction_to_create(item_ids: dict[uuid.UUID, int]) -> TransactionToCreate:
+    return TransactionToCreate(
+        item_ids=item_ids,
+        delivery_option_id=str(uuid.uuid4()),
+        discount_codes=[],
+        name="John",
+        last_name="Doe",
+        email="john@example.com",
+        phone="+48",
+        country="Poland",
+        city="Krakow",
+        postal_code="31-001",
+        address_line_1="Wawel",
+    )
+
+
+def test_get_request_hash() -> None:
+    req_body = get_transaction_to_create({ITEM_IDS[0]: 1, ITEM_IDS[1]: 2})
+    reordered = req_body.model_copy(update={"item_ids": {ITEM_IDS[1]: 2, ITEM_IDS[0]: 1}})
+    changed = req_body.model_copy(update={"item_ids": {ITEM_IDS[0]: 1, ITEM_IDS[1]: 3}})
+    assert get_request_hash(req_body) == get_request_hash(reordered)
+    assert get_request_hash(req_body) != get_request_hash(changed)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("claimed", "request_hash", "expected"),
+    [
+        (True, "hash", None),
+        (False, "hash", {"transaction": {}}),
+        (False, "other-hash", ExcIdempotencyKeyReused),
+    ],
+)
+async def test_claim_idempotency_key(
+    claimed: bool, request_hash: str, expected: dict | None | type[Exception]
+) -> None:
+    mock_db_session = Mock()
+    mock_db_session.exec = AsyncMock(return_value=Mock())
+    mock_db_session.exec.return_value.first.return_value = uuid.uuid4() if claimed else None
+    mock_db_session.exec.return_value.one.return_value = Mock(
+        request_hash="hash", response={"transaction": {}}
+    )
+    if isinstance(expected, type):
+        with pytest.raises(expected):
+            await claim_idempotency_key(mock_db_session, uuid.uuid4(), "key", request_hash, 60)
+    else:
+        result = await claim_idempotency_key(mock_db_session, uuid.uuid4(), "key", request_hash, 60)
+        assert result == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("batch_counts", "interval_seconds", "expected_calls"),
+    [
+        ([0], 60, 1),
+        ([500, 500, 120], 60, 3),
+        ([500, 500, 500, 500], 1, 2),
+    ],
+)
+async def test_finalize_transactions(
+    monkeypatch: pytest.MonkeyPatch,
+    batch_counts: list[int],
+    interval_seconds: float,
+    expected_calls: int,
+) -> None:
+    settings = Settings().model_copy(
+        update={
+            "finalizer_batch_size": 500,
+            "finalizer_target_per_second": 1000,
+            "finalizer_interval_seconds": interval_seconds,
+        }
+    )
+    mock_finalize_batch = AsyncMock(side_effect=batch_counts)
+    mock_sleep = AsyncMock()
+    monkeypatch.setattr(transactions_utils, "get_settings", lambda: settings)
+    monkeypatch.setattr(transactions_utils, "async_session_factory", MagicMock())
+    monkeypatch.setattr(transactions_utils, "finalize_transactions_batch", mock_finalize_batch)
+    monkeypatch.setattr(transactions_utils.asyncio, "sleep", mock_sleep)
+
+    await transactions_utils.finalize_transactions()
+
+    assert mock_finalize_batch.await_count == expected_calls
+    assert all(call.args[1] == 500 for call in mock_finalize_batch.await_args_list)
+    assert mock_sleep.await_count == expected_calls - 1
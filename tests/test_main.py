@@ -0,0 +1,29 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+ROOT = Path(__file__).parents[1]
+
+
+def test_import_main_defers_initialization(tmp_path: Path) -> None:
+    # Engine, log listener and log file are set up on first use, not on import.
+    code = (
+        "import threading\n"
+        "import app.main\n"
+        "from app.database.utils import get_engine\n"
+        "from app.logger.utils import get_log_listener\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+        "assert not get_engine.cache_info().currsize\n"
+        "assert not get_log_listener.cache_info().currsize\n"
+        "assert 'apscheduler' not in sys.modules\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{code}"],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / "logs").exists()
@@ -0,0 +1,25 @@
+import json
+
+from pydantic import BaseModel
+
+from app.utils.responses import ModelResponse, to_ndjson
+
+
+class Model(BaseModel):
+    name: str
+    description: str | None = None
+
+
+def test_model_response() -> None:
+    response = ModelResponse(Model(name="ąę"), status_code=201, exclude_none=True)
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"name": "ąę"}
+    assert response.headers["content-length"] == str(len(response.body))
+    assert json.loads(ModelResponse(Model(name="x")).body) == {"name": "x", "description": None}
+
+
+def test_to_ndjson() -> None:
+    lines = to_ndjson([Model(name="a"), Model(name="b", description="c")], exclude_none=True)
+    assert lines == b'{"name":"a"}\n{"name":"b","description":"c"}\n'
+    assert to_ndjson([]) == b""